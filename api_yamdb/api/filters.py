@@ -1,5 +1,26 @@
+from django.db.models import CharField, Count, F, Value
+from django.db.models.functions import Cast
 from django_filters import FilterSet, rest_framework
-from reviews.models import Title
+from reviews.models import Comment, Genre_Title, Review, Title
+from reviews.search import COMMENT_INDEX, REVIEW_INDEX, TITLE_INDEX
+from reviews.versions import filter_titles_changed_since
+
+
+class TitleOrderingFilter(rest_framework.OrderingFilter):
+    '''
+    Сортировка произведений с добавлением id для стабильной пагинации.
+
+    id сортируется в том же направлении, что и последний ключ: индекс
+    по столбцу хранит строки с равными значениями в порядке id, поэтому
+    БД читает индекс в одну сторону без сортировки групп равных значений.
+    '''
+    def filter(self, qs, value):
+        qs = super().filter(qs, value)
+        if value:
+            order_by = qs.query.order_by
+            tie_breaker = '-pk' if str(order_by[-1]).startswith('-') else 'pk'
+            return qs.order_by(*order_by, tie_breaker)
+        return qs
 
 
 class TitleFilter(FilterSet):
@@ -14,7 +35,134 @@ class TitleFilter(FilterSet):
         field_name='name',
         lookup_expr='contains'
     )
+    search = rest_framework.CharFilter(method='filter_search')
+    ordering = TitleOrderingFilter(
+        fields=(
+            ('rating', 'rating'),
+            ('score_count', 'reviews_count'),
+            ('year', 'year'),
+            ('name', 'name'),
+        )
+    )
 
     class Meta:
         model = Title
         fields = ('name', 'year')
+
+    def filter_search(self, queryset, name, value):
+        return TITLE_INDEX.search(queryset, value)
+
+
+class TitleFacetFilter(TitleFilter):
+    '''
+    Фильтры произведений для подсчёта фасетов: поиск без ранга,
+    сортировка не нужна.
+    '''
+    ordering = None
+
+    def filter_search(self, queryset, name, value):
+        return TITLE_INDEX.filter(queryset, value)
+
+
+def count_facets(titles):
+    '''
+    Считает произведения по жанрам, категориям и годам одним запросом.
+
+    Возвращает словарь вида {'count': …, 'genre': {slug: …},
+    'category': {slug: …}, 'year': {year: …}}.
+    '''
+    titles = titles.order_by()
+    title_ids = titles.values('pk')
+
+    def facet(queryset, name, key):
+        return queryset.order_by().annotate(
+            facet=Value(name, output_field=CharField()),
+            key=Cast(key, CharField()),
+        ).values('facet', 'key').annotate(count=Count('pk'))
+
+    rows = facet(titles, 'count', Value('')).union(
+        facet(
+            Genre_Title.objects.filter(title__in=title_ids),
+            'genre', F('genre__slug')
+        ),
+        facet(
+            Title.objects.filter(pk__in=title_ids),
+            'category', F('category__slug')
+        ),
+        facet(Title.objects.filter(pk__in=title_ids), 'year', F('year')),
+        all=True,
+    )
+    facets = {'count': 0, 'genre': {}, 'category': {}, 'year': {}}
+    for row in rows:
+        if row['facet'] == 'count':
+            facets['count'] = row['count']
+        else:
+            facets[row['facet']][row['key']] = row['count']
+    return facets
+
+
+class ReviewSearchFilter(FilterSet):
+
+    q = rest_framework.CharFilter(method='filter_search', required=True)
+    title = rest_framework.NumberFilter(field_name='title_id')
+    author = rest_framework.CharFilter(field_name='author__username')
+
+    class Meta:
+        model = Review
+        fields = ('q', 'title', 'author')
+
+    def filter_search(self, queryset, name, value):
+        return REVIEW_INDEX.search(queryset, value)
+
+
+class CommentSearchFilter(FilterSet):
+
+    q = rest_framework.CharFilter(method='filter_search', required=True)
+    title = rest_framework.NumberFilter(field_name='review__title_id')
+    review = rest_framework.NumberFilter(field_name='review_id')
+    author = rest_framework.CharFilter(field_name='author__username')
+
+    class Meta:
+        model = Comment
+        fields = ('q', 'title', 'review', 'author')
+
+    def filter_search(self, queryset, name, value):
+        return COMMENT_INDEX.search(queryset, value)
+
+
+class TitleExportFilter(TitleFilter):
+    '''
+    Фильтры выгрузки произведений; выгрузка всегда идёт в порядке id.
+    '''
+    ordering = None
+    since = rest_framework.IsoDateTimeFilter(method='filter_since')
+
+    def filter_since(self, queryset, name, value):
+        return filter_titles_changed_since(queryset, value)
+
+
+class ReviewExportFilter(FilterSet):
+
+    since = rest_framework.IsoDateTimeFilter(
+        field_name='pub_date', lookup_expr='gte'
+    )
+    title = rest_framework.NumberFilter(field_name='title_id')
+    author = rest_framework.CharFilter(field_name='author__username')
+
+    class Meta:
+        model = Review
+        fields = ('since', 'title', 'author', 'score')
+
+
+class CommentExportFilter(FilterSet):
+
+    since = rest_framework.IsoDateTimeFilter(
+        field_name='pub_date', lookup_expr='gte'
+    )
+    title = rest_framework.NumberFilter(field_name='review__title_id')
+    review = rest_framework.NumberFilter(field_name='review_id')
+    author = rest_framework.CharFilter(field_name='author__username')
+
+    class Meta:
+        model = Comment
+        fields = ('since', 'title', 'review', 'author')
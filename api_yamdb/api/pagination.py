@@ -0,0 +1,101 @@
+from base64 import b64decode, b64encode
+from binascii import Error as BinasciiError
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class PubDateKeysetPagination(BasePagination):
+    '''
+    Постраничный вывод по ключу (pub_date, id) от новых к старым.
+
+    Курсор хранит дату и id крайней записи страницы, поэтому любая страница
+    выбирается одним запросом по индексу без OFFSET и COUNT(*).
+    Условие по курсору дублируется нестрогим сравнением даты: по OR
+    базе не построить диапазон индекса, а по нему - можно.
+    Пустое значение курсора возвращает первую страницу.
+    '''
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор.'
+    ordering = ('-pub_date', '-pk')
+
+    def __init__(self):
+        self.page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+
+    @classmethod
+    def is_requested(cls, request):
+        return cls.cursor_query_param in request.query_params
+
+    def encode_cursor(self, obj, reverse):
+        position = f'{obj.pub_date.isoformat()}|{obj.pk}|{int(reverse)}'
+        cursor = b64encode(position.encode()).decode()
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, cursor
+        )
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            pub_date, pk, reverse = b64decode(
+                cursor.encode(), validate=True
+            ).decode().split('|')
+            pub_date = parse_datetime(pub_date)
+            pk = int(pk)
+            reverse = bool(int(reverse))
+        except (BinasciiError, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if pub_date is None:
+            raise NotFound(self.invalid_cursor_message)
+        return pub_date, pk, reverse
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = remove_query_param(
+            request.build_absolute_uri(), self.cursor_query_param
+        )
+        position = self.decode_cursor(request)
+        self.next = self.previous = None
+        if position is None:
+            rows = list(queryset.order_by(*self.ordering)[:self.page_size + 1])
+            page = rows[:self.page_size]
+            if len(rows) > self.page_size:
+                self.next = self.encode_cursor(page[-1], reverse=False)
+            return page
+
+        pub_date, pk, reverse = position
+        if reverse:
+            rows = list(queryset.filter(
+                Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, pk__gt=pk),
+                pub_date__gte=pub_date,
+            ).order_by('pub_date', 'pk')[:self.page_size + 1])
+            page = rows[:self.page_size][::-1]
+            if len(rows) > self.page_size:
+                self.previous = self.encode_cursor(page[0], reverse=True)
+            if page:
+                self.next = self.encode_cursor(page[-1], reverse=False)
+            return page
+
+        rows = list(queryset.filter(
+            Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk),
+            pub_date__lte=pub_date,
+        ).order_by(*self.ordering)[:self.page_size + 1])
+        page = rows[:self.page_size]
+        if len(rows) > self.page_size:
+            self.next = self.encode_cursor(page[-1], reverse=False)
+        if page:
+            self.previous = self.encode_cursor(page[0], reverse=True)
+        return page
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict((
+            ('next', self.next),
+            ('previous', self.previous),
+            ('results', data),
+        )))
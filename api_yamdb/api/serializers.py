@@ -1,11 +1,193 @@
+from collections import OrderedDict
+from collections.abc import Mapping
 from datetime import date
-from django.db.models import Avg
-from django.shortcuts import get_object_or_404
+from functools import partial
+from operator import attrgetter
+
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import models
+from django.utils.functional import cached_property
 from rest_framework import serializers
-from reviews.models import Review, Comment, Category, Genre, Title
+from rest_framework.fields import SkipField
+from rest_framework.permissions import SAFE_METHODS
+from reviews.models import (
+    Review, Comment, Category, Genre, Title, ScoreHistogram
+)
 from users.models import User
 
 
+REVIEW_EXISTS_MESSAGE = 'Нельзя добавлять более одного отзыва!'
+HISTOGRAM_PARAM = 'histogram'
+HISTOGRAM_PARAM_TRUE = ('1', 'true')
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+COMPILED_CONTEXT = 'compiled'
+BUILTIN_REPRESENTATIONS = {
+    serializers.CharField.to_representation: str,
+    serializers.IntegerField.to_representation: int,
+    serializers.FloatField.to_representation: float,
+}
+
+
+def histogram_requested(request):
+    '''
+    Проверяет, запрошено ли распределение оценок в ответе.
+    '''
+    if request is None:
+        return False
+    value = request.query_params.get(HISTOGRAM_PARAM, '')
+    return value.lower() in HISTOGRAM_PARAM_TRUE
+
+
+def get_histogram(title_obj):
+    '''
+    Распределение оценок произведения; без отзывов все счётчики нулевые.
+    '''
+    try:
+        return title_obj.histogram.as_dict()
+    except ScoreHistogram.DoesNotExist:
+        return ScoreHistogram(title=title_obj).as_dict()
+
+
+def sparse_requested(request):
+    '''
+    Проверяет, ограничен ли состав полей ответа параметрами fields и omit.
+
+    Учитываются только безопасные запросы: при записи сериализатор
+    должен принимать все поля.
+    '''
+    if request is None or request.method not in SAFE_METHODS:
+        return False
+    return (
+        FIELDS_PARAM in request.query_params
+        or OMIT_PARAM in request.query_params
+    )
+
+
+def get_param_names(request, param):
+    '''
+    Имена полей из параметра запроса вида name1,name2.
+    '''
+    return {
+        name.strip()
+        for name in request.query_params.get(param, '').split(',')
+        if name.strip()
+    }
+
+
+class SparseFieldsMixin:
+    '''
+    Оставляет в ответе поля из параметра fields и убирает поля
+    из параметра omit.
+    '''
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if not sparse_requested(request):
+            return
+        fields = get_param_names(request, FIELDS_PARAM)
+        omit = get_param_names(request, OMIT_PARAM)
+        for name in tuple(self.fields):
+            if fields and name not in fields or name in omit:
+                self.fields.pop(name)
+
+
+def compile_converter(field):
+    '''
+    Преобразование значения поля, равное field.to_representation.
+    '''
+    if isinstance(field, serializers.ListSerializer) and isinstance(
+        field.child, CompiledRepresentationMixin
+    ):
+        represent = field.child.compiled_representation
+
+        def convert(data):
+            if isinstance(data, models.Manager):
+                data = data.all()
+            return [represent(item) for item in data]
+        return convert
+    if isinstance(field, CompiledRepresentationMixin):
+        return field.compiled_representation
+    if isinstance(field, serializers.SlugRelatedField):
+        return attrgetter(field.slug_field)
+    return BUILTIN_REPRESENTATIONS.get(
+        type(field).to_representation, field.to_representation
+    )
+
+
+def read_field(field, instance):
+    '''
+    Значение поля для ответа так, как его вычисляет Serializer DRF.
+    '''
+    attribute = field.get_attribute(instance)
+    if isinstance(attribute, serializers.PKOnlyObject):
+        if attribute.pk is None:
+            return None
+    elif attribute is None:
+        return None
+    return field.to_representation(attribute)
+
+
+def compile_reader(field):
+    '''
+    Чтение поля из объекта модели с теми же правилами, что у DRF:
+    отсутствующий связанный объект и None дают None.
+    '''
+    if isinstance(field, serializers.SerializerMethodField):
+        return getattr(field.parent, field.method_name)
+    simple = not isinstance(field, serializers.ReadOnlyField) and (
+        isinstance(field, serializers.SlugRelatedField)
+        or type(field).get_attribute is serializers.Field.get_attribute
+    )
+    if not simple or not field.source_attrs:
+        return partial(read_field, field)
+    getter = attrgetter('.'.join(field.source_attrs))
+    convert = compile_converter(field)
+
+    def read(instance):
+        try:
+            value = getter(instance)
+        except ObjectDoesNotExist:
+            return None
+        except (AttributeError, KeyError):
+            return read_field(field, instance)
+        return None if value is None else convert(value)
+    return read
+
+
+class CompiledRepresentationMixin:
+    '''
+    Быстрое представление для чтения объектов модели.
+
+    Способ чтения и преобразования каждого поля определяется один раз
+    на сериализатор, а не для каждого объекта; JSON совпадает с ответом
+    DRF побайтно. В контексте compiled=False используется обычный путь.
+    '''
+    @cached_property
+    def compiled_representation(self):
+        if not self.context.get(COMPILED_CONTEXT, True):
+            return super().to_representation
+        readers = tuple(
+            (field.field_name, compile_reader(field))
+            for field in self._readable_fields
+        )
+
+        def represent(instance):
+            ret = OrderedDict()
+            for name, read in readers:
+                try:
+                    ret[name] = read(instance)
+                except SkipField:
+                    continue
+            return ret
+        return represent
+
+    def to_representation(self, instance):
+        if isinstance(instance, Mapping):
+            return super().to_representation(instance)
+        return self.compiled_representation(instance)
+
+
 class UserEmailSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -21,7 +203,7 @@ class ConfirmationCodeSerializer(serializers.Serializer):
         fields = ('username', 'confirmation_code')
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = (
@@ -34,7 +216,7 @@ class UserSerializer(serializers.ModelSerializer):
         )
 
 
-class MeSerializer(serializers.ModelSerializer):
+class MeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = (
@@ -48,7 +230,11 @@ class MeSerializer(serializers.ModelSerializer):
         read_only_fields = ('role', )
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(
+    CompiledRepresentationMixin,
+    SparseFieldsMixin,
+    serializers.ModelSerializer
+):
     author = serializers.SlugRelatedField(
         read_only=True,
         slug_field='username'
@@ -58,29 +244,12 @@ class ReviewSerializer(serializers.ModelSerializer):
         model = Review
         fields = ('id', 'text', 'author', 'score', 'pub_date')
 
-    def validate(self, data):
-        """Проверка чтобы пользователь не мог добавить более одного отзыва."""
-        request = self.context.get('request')
-        if request.method != 'POST':
-            return data
-        user = None
-        if request and hasattr(request, 'user'):
-            user = request.user
-        kwargs = request.parser_context.get('kwargs')
-        title_id = kwargs.get('title_id')
-        title = get_object_or_404(Title, id=title_id)
-        review_exist = Review.objects.filter(
-            author=user,
-            title=title
-        ).exists()
-        if review_exist:
-            raise serializers.ValidationError(
-                'Нельзя добавлять более одного отзыва!'
-            )
-        return data
 
-
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(
+    CompiledRepresentationMixin,
+    SparseFieldsMixin,
+    serializers.ModelSerializer
+):
     author = serializers.SlugRelatedField(
         read_only=True,
         slug_field='username'
@@ -91,7 +260,29 @@ class CommentSerializer(serializers.ModelSerializer):
         fields = ('id', 'text', 'author', 'pub_date')
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class ReviewSearchSerializer(ReviewSerializer):
+    '''
+    Класс ReviewSearchSerializer для результатов поиска по отзывам.
+    '''
+    class Meta(ReviewSerializer.Meta):
+        fields = ReviewSerializer.Meta.fields + ('title',)
+
+
+class CommentSearchSerializer(CommentSerializer):
+    '''
+    Класс CommentSearchSerializer для результатов поиска по комментариям.
+    '''
+    title = serializers.IntegerField(source='review.title_id', read_only=True)
+
+    class Meta(CommentSerializer.Meta):
+        fields = CommentSerializer.Meta.fields + ('review', 'title')
+
+
+class CategorySerializer(
+    CompiledRepresentationMixin,
+    SparseFieldsMixin,
+    serializers.ModelSerializer
+):
     '''
     Класс CategorySerializer для модели Category.
     '''
@@ -100,7 +291,11 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ('name', 'slug')
 
 
-class GenreSerializer(serializers.ModelSerializer):
+class GenreSerializer(
+    CompiledRepresentationMixin,
+    SparseFieldsMixin,
+    serializers.ModelSerializer
+):
     '''
     Класс GenreSerializer для модели Genre.
     '''
@@ -109,13 +304,18 @@ class GenreSerializer(serializers.ModelSerializer):
         fields = ('name', 'slug')
 
 
-class TitleSerializer(serializers.ModelSerializer):
+class TitleSerializer(
+    CompiledRepresentationMixin,
+    SparseFieldsMixin,
+    serializers.ModelSerializer
+):
     '''
     Класс TitleSerializer для модели Title.
     '''
-    rating = serializers.SerializerMethodField(method_name='get_rating')
+    rating = serializers.IntegerField(read_only=True)
     genre = GenreSerializer(many=True, required=True)
     category = CategorySerializer(many=False, required=True)
+    histogram = serializers.SerializerMethodField()
 
     class Meta:
         model = Title
@@ -126,14 +326,30 @@ class TitleSerializer(serializers.ModelSerializer):
             'rating',
             'description',
             'genre',
-            'category'
+            'category',
+            'histogram'
         )
 
-    def get_rating(self, title_obj):
-        if title_obj.reviews.count() > 0:
-            score = title_obj.reviews.aggregate(Avg('score'))
-            return int(score.get('score__avg'))
-        return None
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if not histogram_requested(self.context.get('request')):
+            self.fields.pop('histogram', None)
+
+    def get_histogram(self, title_obj):
+        return get_histogram(title_obj)
+
+
+class TopTitleSerializer(TitleSerializer):
+    '''
+    Класс TopTitleSerializer для рейтинга лучших произведений.
+    '''
+    weighted_rating = serializers.FloatField(
+        source='rank.weighted_rating',
+        read_only=True,
+    )
+
+    class Meta(TitleSerializer.Meta):
+        fields = TitleSerializer.Meta.fields + ('weighted_rating',)
 
 
 class TitleEditSerializer(serializers.ModelSerializer):
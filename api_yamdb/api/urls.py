@@ -7,6 +7,11 @@ from api.views import (
     GenreViewSet,
     TitleViewSet,
     UsersViewSet,
+    ReviewSearchViewSet,
+    CommentSearchViewSet,
+    TitleExportViewSet,
+    ReviewExportViewSet,
+    CommentExportViewSet,
     send_confirmation_code,
     get_token
 )
@@ -19,6 +24,12 @@ router.register('v1/users', UsersViewSet, basename='user')
 router.register('v1/titles', TitleViewSet)
 router.register('v1/categories', CategoryViewSet)
 router.register('v1/genres', GenreViewSet)
+router.register(
+    'v1/reviews/search', ReviewSearchViewSet, basename='review-search'
+)
+router.register(
+    'v1/comments/search', CommentSearchViewSet, basename='comment-search'
+)
 router.register(
     r'v1/titles/(?P<title_id>\d+)/reviews',
     ReviewViewSet
@@ -35,5 +46,20 @@ urlpatterns = [
         name='SendConfirmationCode'
     ),
     path('v1/auth/token/', get_token, name='GetToken'),
+    path(
+        'v1/export/titles.ndjson',
+        TitleExportViewSet.as_view({'get': 'list'}),
+        name='export-titles'
+    ),
+    path(
+        'v1/export/reviews.ndjson',
+        ReviewExportViewSet.as_view({'get': 'list'}),
+        name='export-reviews'
+    ),
+    path(
+        'v1/export/comments.ndjson',
+        CommentExportViewSet.as_view({'get': 'list'}),
+        name='export-comments'
+    ),
     path('', include(router.urls)),
 ]
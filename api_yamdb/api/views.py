@@ -1,18 +1,32 @@
+from hashlib import md5
+
 from django.contrib.auth.tokens import default_token_generator
+from django.core.cache import caches
+from django.core.exceptions import FieldDoesNotExist
 from django.core.mail import send_mail
+from django.db import IntegrityError, transaction
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
 
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import filters, status, viewsets, permissions, mixins
+from rest_framework import (
+    filters, status, viewsets, permissions, mixins, serializers
+)
 from rest_framework.decorators import action, api_view
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework_simplejwt.tokens import AccessToken
 from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.renderers import JSONRenderer
 
 from api_yamdb import settings
 
 from users.models import User
+from reviews import versions
 from reviews.models import Review, Comment, Category, Genre, Title
 from api.serializers import (
     ReviewSerializer,
@@ -24,17 +38,37 @@ from api.serializers import (
     CategorySerializer,
     GenreSerializer,
     TitleSerializer,
-    TitleEditSerializer
+    TitleEditSerializer,
+    TopTitleSerializer,
+    ReviewSearchSerializer,
+    CommentSearchSerializer,
+    histogram_requested,
+    get_histogram,
+    sparse_requested,
+    REVIEW_EXISTS_MESSAGE
 )
 from api.permissions import (
     IsAdministrator,
     AuthorStaffOrReadOnly,
     IsAdministratorOrReadOnly
 )
-from api.filters import TitleFilter
+from api.filters import (
+    CommentExportFilter,
+    CommentSearchFilter,
+    ReviewExportFilter,
+    ReviewSearchFilter,
+    TitleExportFilter,
+    TitleFacetFilter,
+    TitleFilter,
+    count_facets
+)
+from api.pagination import PubDateKeysetPagination
 
 
 USERNAME_ME = 'me'
+TOP_TITLES_DEFAULT = 50
+TOP_TITLES_MAX = 100
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
 
 
 @api_view(('POST',))
@@ -78,7 +112,60 @@ def get_token(request):
     )
 
 
-class UsersViewSet(viewsets.ModelViewSet):
+class SparseQuerysetMixin:
+    '''
+    Сужает выборку под поля ответа из параметров fields и omit.
+
+    Столбцы пропущенных полей не загружаются, а связи, нужные только
+    им, не присоединяются и не подгружаются. Для полей, чей источник
+    сериализатору неизвестен, его задаёт sparse_sources.
+    '''
+    sparse_sources = {}
+
+    def get_sparse_sources(self, serializer_class=None):
+        serializer_class = serializer_class or self.get_serializer_class()
+        fields = serializer_class(context=self.get_serializer_context()).fields
+        for name, field in fields.items():
+            source = self.sparse_sources.get(name, field.source)
+            if source == '*':
+                continue
+            source = source.replace('.', '__')
+            if isinstance(field, serializers.SlugRelatedField):
+                source = f'{source}__{field.slug_field}'
+            yield source
+
+    def prune_queryset(self, queryset, serializer_class=None):
+        if not sparse_requested(self.request):
+            return queryset
+        meta = queryset.model._meta
+        columns = {meta.pk.name}
+        columns.update(name.lstrip('-') for name in meta.ordering)
+        relations = set()
+        for source in self.get_sparse_sources(serializer_class):
+            root = source.split('__')[0]
+            relations.add(root)
+            try:
+                model_field = meta.get_field(root)
+            except FieldDoesNotExist:
+                continue
+            if not (model_field.many_to_many or model_field.one_to_many):
+                columns.add(source)
+        select_related = queryset.query.select_related
+        if isinstance(select_related, dict):
+            queryset = queryset.select_related(None).select_related(*(
+                name for name in select_related if name in relations
+            ))
+        prefetch_related = queryset._prefetch_related_lookups
+        if prefetch_related:
+            queryset = queryset.prefetch_related(None).prefetch_related(*(
+                lookup for lookup in prefetch_related
+                if getattr(lookup, 'prefetch_to', lookup).split('__')[0]
+                in relations
+            ))
+        return queryset.only(*columns)
+
+
+class UsersViewSet(SparseQuerysetMixin, viewsets.ModelViewSet):
     permission_classes = (permissions.IsAuthenticated, IsAdministrator)
     queryset = User.objects.all()
     serializer_class = UserSerializer
@@ -87,6 +174,9 @@ class UsersViewSet(viewsets.ModelViewSet):
     search_fields = ('username',)
     lookup_field = 'username'
 
+    def get_queryset(self):
+        return self.prune_queryset(super().get_queryset())
+
     @action(
         methods=('patch', 'get'),
         permission_classes=(permissions.IsAuthenticated,),
@@ -96,7 +186,9 @@ class UsersViewSet(viewsets.ModelViewSet):
     )
     def me(self, request, *args, **kwargs):
         user = self.request.user
-        serializer = MeSerializer(user)
+        serializer = MeSerializer(
+            user, context=self.get_serializer_context()
+        )
         if self.request.method != 'PATCH':
             return Response(serializer.data)
         serializer = MeSerializer(
@@ -119,46 +211,250 @@ class GetUserViewSet(viewsets.ModelViewSet):
         return user
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+def get_view_versions(view):
+    '''
+    Версии ресурсов из get_version_keys() представления,
+    читаются один раз за запрос.
+    '''
+    if not hasattr(view, '_resource_versions'):
+        view._resource_versions = versions.get_versions(
+            view.get_version_keys()
+        )
+    return view._resource_versions
+
+
+class ConditionalListMixin:
+    '''
+    Отвечает 304 на условные GET-запросы списка.
+
+    ETag и Last-Modified вычисляются по счётчикам изменений ресурсов,
+    поэтому при неизменных данных выборка и сериализация не выполняются.
+    Ключи счётчиков (см. reviews.versions), от которых зависит ответ,
+    возвращает метод get_version_keys(), который задаёт представление.
+    '''
+    def conditional_response(self, handler, request, *args, **kwargs):
+        resource_versions, modified = get_view_versions(self)
+        stamp = ';'.join(
+            f'{key}={version}'
+            for key, version in sorted(resource_versions.items())
+        )
+        etag = quote_etag(md5(
+            f'{request.get_full_path()}|{request.accepted_media_type}|'
+            f'{stamp}'.encode()
+        ).hexdigest())
+        last_modified = int(modified.timestamp()) if modified else None
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (
+            status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED
+        ):
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+
+class CachedListMixin:
+    '''
+    Кэширует ответ списка до изменения ресурсов из get_version_keys.
+
+    Версии входят в ключ кэша, поэтому запись ресурса сама делает
+    старые ответы недоступными.
+    '''
+    def list_cache_key(self, request):
+        resource_versions, modified = get_view_versions(self)
+        stamp = ';'.join(
+            f'{key}={version}'
+            for key, version in sorted(resource_versions.items())
+        )
+        changed = modified.timestamp() if modified else 0
+        return md5(
+            f'{request.get_full_path()}|{request.accepted_media_type}|'
+            f'{stamp}|{changed}'.encode()
+        ).hexdigest()
+
+    def list(self, request, *args, **kwargs):
+        cache = caches[settings.API_CACHE_ALIAS]
+        key = f'list:{self.list_cache_key(request)}'
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+        response = super().list(request, *args, **kwargs)
+        cache.set(key, response.data, settings.API_CACHE_TIMEOUT)
+        return response
+
+
+class ConditionalGetMixin(ConditionalListMixin):
+    '''
+    Отвечает 304 на условные GET-запросы списка и объекта.
+    '''
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+
+class KeysetPaginationMixin:
+    '''
+    Переключает список на постраничный вывод по ключу (pub_date, id),
+    если в запросе передан параметр cursor.
+    '''
+    keyset_pagination_class = PubDateKeysetPagination
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            if self.keyset_pagination_class.is_requested(self.request):
+                self._paginator = self.keyset_pagination_class()
+            else:
+                self._paginator = super().paginator
+        return self._paginator
+
+
+class ReviewViewSet(
+    ConditionalGetMixin,
+    KeysetPaginationMixin,
+    SparseQuerysetMixin,
+    viewsets.ModelViewSet
+):
     queryset = Review.objects.all()
     serializer_class = ReviewSerializer
     pagination_class = LimitOffsetPagination
     permission_classes = (AuthorStaffOrReadOnly,)
 
+    def get_title(self):
+        """Произведение из адреса, загружается один раз за запрос."""
+        if not hasattr(self, '_title'):
+            self._title = get_object_or_404(
+                Title, id=self.kwargs.get('title_id')
+            )
+        return self._title
+
+    @transaction.atomic
     def perform_create(self, serializer):
-        title_id = self.kwargs.get('title_id')
-        title = get_object_or_404(Title, id=title_id)
-        serializer.save(
-            author=self.request.user,
-            title=title
-        )
+        """Повторный отзыв отклоняет ограничение one_author-one_review."""
+        title = self.get_title()
+        try:
+            with transaction.atomic():
+                serializer.save(
+                    author=self.request.user,
+                    title=title
+                )
+        except IntegrityError:
+            raise ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: [REVIEW_EXISTS_MESSAGE]}
+            )
+
+    @transaction.atomic
+    def update(self, request, *args, **kwargs):
+        """Отзыв читается и меняется в одной транзакции под блокировкой
+        строки, чтобы параллельные правки не считали изменение рейтинга
+        от одной и той же старой оценки."""
+        return super().update(request, *args, **kwargs)
+
+    @transaction.atomic
+    def destroy(self, request, *args, **kwargs):
+        return super().destroy(request, *args, **kwargs)
 
     def get_queryset(self):
-        title_id = self.kwargs.get('title_id')
-        title = get_object_or_404(Title, id=title_id)
-        return title.reviews.all()
+        if self.request.method not in permissions.SAFE_METHODS:
+            return self.get_title().reviews.select_for_update()
+        return self.prune_queryset(Review.objects.filter(
+            title_id=self.get_title().pk
+        ).select_related('author'))
+
+    def get_version_keys(self):
+        return (
+            versions.title_reviews_key(self.kwargs.get('title_id')),
+            versions.USERS,
+        )
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(
+    ConditionalGetMixin,
+    KeysetPaginationMixin,
+    SparseQuerysetMixin,
+    viewsets.ModelViewSet
+):
     queryset = Comment.objects.all()
     serializer_class = CommentSerializer
     permission_classes = (AuthorStaffOrReadOnly,)
 
+    def get_review(self):
+        """Отзыв из адреса, загружается одним запросом вместе с проверкой
+        принадлежности произведению и кешируется на время запроса."""
+        if not hasattr(self, '_review'):
+            self._review = get_object_or_404(
+                Review,
+                id=self.kwargs.get('review_id'),
+                title_id=self.kwargs.get('title_id')
+            )
+        return self._review
+
     def perform_create(self, serializer):
-        review_id = self.kwargs.get('review_id')
-        review = get_object_or_404(Review, id=review_id)
         serializer.save(
             author=self.request.user,
-            review=review
+            review=self.get_review()
+        )
+
+    def get_queryset(self):
+        return self.prune_queryset(Comment.objects.filter(
+            review_id=self.get_review().pk
+        ).select_related('author'))
+
+    def get_version_keys(self):
+        return (
+            versions.review_comments_key(self.kwargs.get('review_id')),
+            versions.USERS,
         )
 
+
+class ReviewSearchViewSet(
+    SparseQuerysetMixin,
+    viewsets.GenericViewSet,
+    mixins.ListModelMixin
+):
+    '''
+    Полнотекстовый поиск по отзывам.
+    '''
+    queryset = Review.objects.select_related('author')
+    serializer_class = ReviewSearchSerializer
+    filter_backends = (DjangoFilterBackend,)
+    filterset_class = ReviewSearchFilter
+
     def get_queryset(self):
-        review_id = self.kwargs.get('review_id')
-        review = get_object_or_404(Review, id=review_id)
-        return review.comments.all()
+        return self.prune_queryset(super().get_queryset())
+
+
+class CommentSearchViewSet(
+    SparseQuerysetMixin,
+    viewsets.GenericViewSet,
+    mixins.ListModelMixin
+):
+    '''
+    Полнотекстовый поиск по комментариям.
+    '''
+    queryset = Comment.objects.select_related('author', 'review')
+    serializer_class = CommentSearchSerializer
+    filter_backends = (DjangoFilterBackend,)
+    filterset_class = CommentSearchFilter
+
+    def get_queryset(self):
+        return self.prune_queryset(super().get_queryset())
 
 
 class CategoryViewSet(
+    ConditionalListMixin,
+    CachedListMixin,
+    SparseQuerysetMixin,
     viewsets.GenericViewSet,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
@@ -176,8 +472,17 @@ class CategoryViewSet(
     )
     search_fields = ('name',)
 
+    def get_queryset(self):
+        return self.prune_queryset(super().get_queryset())
+
+    def get_version_keys(self):
+        return (versions.CATEGORIES,)
+
 
 class GenreViewSet(
+    ConditionalListMixin,
+    CachedListMixin,
+    SparseQuerysetMixin,
     viewsets.GenericViewSet,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
@@ -195,25 +500,150 @@ class GenreViewSet(
     )
     search_fields = ('name',)
 
+    def get_queryset(self):
+        return self.prune_queryset(super().get_queryset())
+
+    def get_version_keys(self):
+        return (versions.GENRES,)
 
-class TitleViewSet(viewsets.ModelViewSet):
+
+class TitleViewSet(
+    ConditionalGetMixin,
+    SparseQuerysetMixin,
+    viewsets.ModelViewSet
+):
     '''
     Класс TitleViewSet для модели Title.
     '''
-    queryset = Title.objects.all()
+    queryset = Title.objects.select_related(
+        'category'
+    ).prefetch_related('genre')
     serializer_class = TitleSerializer
     permission_classes = (IsAdministratorOrReadOnly,)
     filter_backends = (
         DjangoFilterBackend,
     )
     filterset_class = TitleFilter
+    sparse_sources = {'histogram': 'histogram'}
+
+    def get_serializer_class(self):
+        if self.action == 'top':
+            return TopTitleSerializer
+        return super().get_serializer_class()
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if histogram_requested(self.request):
+            queryset = queryset.select_related('histogram')
+        if self.action == 'top':
+            queryset = queryset.select_related('rank').filter(
+                rank__isnull=False
+            )
+        return self.prune_queryset(queryset)
+
+    def get_version_keys(self):
+        if self.action == 'retrieve':
+            title_key = versions.title_key(self.kwargs.get(self.lookup_field))
+        else:
+            title_key = versions.TITLES
+        return (title_key, versions.CATEGORIES, versions.GENRES)
+
+    def get_representations(self, title_ids):
+        '''
+        Готовые представления произведений из кэша в порядке title_ids.
+
+        Ключ кэша содержит версии произведения, категорий и жанров,
+        недостающие представления сериализуются одним запросом.
+        '''
+        cache = caches[settings.API_CACHE_ALIAS]
+        title_keys = {pk: versions.title_key(pk) for pk in title_ids}
+        resource_versions, _ = versions.get_versions(
+            (*title_keys.values(), versions.CATEGORIES, versions.GENRES)
+        )
+        catalog_version = (
+            f'{resource_versions[versions.CATEGORIES]}:'
+            f'{resource_versions[versions.GENRES]}'
+        )
+        cache_keys = {
+            pk: (
+                f'title:{pk}:{resource_versions[title_keys[pk]]}:'
+                f'{catalog_version}'
+            )
+            for pk in title_ids
+        }
+        representations = cache.get_many(cache_keys.values())
+        missing = [
+            pk for pk in title_ids if cache_keys[pk] not in representations
+        ]
+        if missing:
+            titles = Title.objects.select_related(
+                'category'
+            ).prefetch_related('genre').filter(pk__in=missing)
+            loaded = {
+                cache_keys[title.pk]: TitleSerializer(title).data
+                for title in titles
+            }
+            cache.set_many(loaded, settings.API_CACHE_TIMEOUT)
+            representations.update(loaded)
+        return [
+            representations[cache_keys[pk]] for pk in title_ids
+            if cache_keys[pk] in representations
+        ]
+
+    def sparse_representations(self, representations):
+        '''
+        Оставляет в готовых представлениях поля из fields и omit.
+
+        Кэш хранит полные представления, общие для любых наборов полей.
+        '''
+        if not sparse_requested(self.request):
+            return representations
+        fields = self.get_serializer().fields
+        return [
+            {name: data[name] for name in fields} for data in representations
+        ]
+
+    def list_representations(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        title_ids = self.paginate_queryset(
+            queryset.prefetch_related(None).values_list('pk', flat=True)
+        )
+        return self.get_paginated_response(self.sparse_representations(
+            self.get_representations(title_ids)
+        ))
+
+    def retrieve_representation(self, request, *args, **kwargs):
+        pk = self.kwargs.get(self.lookup_field)
+        representations = self.get_representations(
+            (int(pk),) if pk.isdigit() else ()
+        )
+        if not representations:
+            raise NotFound()
+        return Response(self.sparse_representations(representations)[0])
+
+    def list(self, request, *args, **kwargs):
+        if histogram_requested(request):
+            return super().list(request, *args, **kwargs)
+        return self.conditional_response(
+            self.list_representations, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        if histogram_requested(request):
+            return super().retrieve(request, *args, **kwargs)
+        return self.conditional_response(
+            self.retrieve_representation, request, *args, **kwargs
+        )
 
     def create(self, request, *args, **kwargs):
         serializer = TitleEditSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         self.perform_create(serializer)
         headers = self.get_success_headers(serializer.data)
-        output_serializer = TitleSerializer(serializer.instance)
+        output_serializer = TitleSerializer(
+            self.get_queryset().get(pk=serializer.instance.pk),
+            context=self.get_serializer_context()
+        )
         return Response(
             output_serializer.data,
             status=status.HTTP_201_CREATED,
@@ -229,7 +659,133 @@ class TitleViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
         self.perform_update(serializer)
 
-        if getattr(instance, '_prefetched_objects_cache', None):
-            instance._prefetched_objects_cache = {}
-        output_serializer = TitleSerializer(instance)
+        output_serializer = TitleSerializer(
+            self.get_queryset().get(pk=instance.pk),
+            context=self.get_serializer_context()
+        )
         return Response(output_serializer.data)
+
+    @action(methods=('get',), detail=False, url_path='top', url_name='top')
+    def top(self, request):
+        """Лучшие произведения по взвешенному рейтингу."""
+        try:
+            size = int(request.query_params.get('n', TOP_TITLES_DEFAULT))
+        except ValueError:
+            size = 0
+        if not 1 <= size <= TOP_TITLES_MAX:
+            raise ValidationError(
+                {'n': f'Укажите число от 1 до {TOP_TITLES_MAX}.'}
+            )
+        queryset = self.get_queryset()
+        category = request.query_params.get('category')
+        if category:
+            queryset = queryset.filter(category__slug=category)
+        genre = request.query_params.get('genre')
+        if genre:
+            queryset = queryset.filter(genre__slug=genre)
+        queryset = queryset.order_by('-rank__weighted_rating', 'pk')[:size]
+        return Response(self.get_serializer(queryset, many=True).data)
+
+    @action(methods=('get',), detail=False, url_path='facets')
+    def facets(self, request):
+        """Количество произведений по жанрам, категориям и годам."""
+        self.filterset_class = TitleFacetFilter
+        queryset = self.filter_queryset(Title.objects.all())
+        return Response(count_facets(queryset))
+
+    @action(methods=('get',), detail=True, url_path='histogram')
+    def histogram(self, request, pk=None):
+        """Распределение оценок произведения."""
+        title = get_object_or_404(
+            Title.objects.select_related('histogram'), pk=pk
+        )
+        return Response(get_histogram(title))
+
+
+class ExportViewSet(SparseQuerysetMixin, viewsets.GenericViewSet):
+    '''
+    Потоковая выгрузка таблицы в формате NDJSON: один объект JSON
+    в строке, без пагинации и подсчёта записей.
+
+    Записи читаются из БД пачками по EXPORT_CHUNK_SIZE в порядке id,
+    поэтому расход памяти не зависит от размера таблицы.
+    '''
+    permission_classes = (permissions.IsAuthenticated, IsAdministrator)
+    filter_backends = (DjangoFilterBackend,)
+
+    def get_queryset(self):
+        return self.prune_queryset(self.get_export_queryset())
+
+    def get_export_queryset(self):
+        '''
+        Выборка до сужения под поля из fields и omit.
+        '''
+        return super().get_queryset()
+
+    def iterate(self, queryset):
+        '''
+        Объекты выборки пачками; iterator() не выполняет prefetch_related,
+        поэтому такие выборки читаются пачками по id.
+        '''
+        chunk_size = settings.EXPORT_CHUNK_SIZE
+        if not queryset._prefetch_related_lookups:
+            yield from queryset.iterator(chunk_size=chunk_size)
+            return
+        last_pk = None
+        while True:
+            chunk = queryset if last_pk is None else queryset.filter(
+                pk__gt=last_pk
+            )
+            objects = list(chunk[:chunk_size])
+            yield from objects
+            if len(objects) < chunk_size:
+                return
+            last_pk = objects[-1].pk
+
+    def list(self, request, *args, **kwargs):
+        # порядок задаётся после фильтров: поиск сортирует по рангу,
+        # а чтение пачками по id требует порядка id
+        queryset = self.filter_queryset(self.get_queryset()).order_by('pk')
+        serializer = self.get_serializer()
+        renderer = JSONRenderer()
+        lines = (
+            renderer.render(serializer.to_representation(obj)) + b'\n'
+            for obj in self.iterate(queryset)
+        )
+        return StreamingHttpResponse(lines, content_type=NDJSON_CONTENT_TYPE)
+
+
+class TitleExportViewSet(ExportViewSet):
+    '''
+    Выгрузка произведений; since отбирает изменённые не раньше даты.
+    '''
+    queryset = Title.objects.select_related(
+        'category'
+    ).prefetch_related('genre')
+    serializer_class = TitleSerializer
+    filterset_class = TitleExportFilter
+    sparse_sources = {'histogram': 'histogram'}
+
+    def get_export_queryset(self):
+        queryset = super().get_export_queryset()
+        if histogram_requested(self.request):
+            queryset = queryset.select_related('histogram')
+        return queryset
+
+
+class ReviewExportViewSet(ExportViewSet):
+    '''
+    Выгрузка отзывов; since отбирает опубликованные не раньше даты.
+    '''
+    queryset = Review.objects.select_related('author')
+    serializer_class = ReviewSearchSerializer
+    filterset_class = ReviewExportFilter
+
+
+class CommentExportViewSet(ExportViewSet):
+    '''
+    Выгрузка комментариев; since отбирает опубликованные не раньше даты.
+    '''
+    queryset = Comment.objects.select_related('author', 'review')
+    serializer_class = CommentSearchSerializer
+    filterset_class = CommentExportFilter
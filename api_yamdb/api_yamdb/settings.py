@@ -73,6 +73,25 @@ DATABASES = {
 }
 
 
+# Cache
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# кэш версий ресурсов и готовых ответов API. bump() сбрасывает версии
+# только в этом кэше, поэтому при нескольких процессах он должен быть
+# общим (Memcached, Redis, БД); LocMemCache подходит только для одного
+# процесса
+API_CACHE_ALIAS = 'default'
+API_CACHE_TIMEOUT = 60 * 60
+
+# число записей, читаемых из БД за раз при потоковой выгрузке NDJSON
+EXPORT_CHUNK_SIZE = 2000
+
+
 # Password validation
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -123,6 +142,13 @@ REST_FRAMEWORK = {
         'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
 }
+# вес средней оценки по всем отзывам в рейтинге лучших произведений:
+# столько условных отзывов со средней оценкой добавляется каждому произведению
+LEADERBOARD_PRIOR_WEIGHT = 10
+# средняя оценка для рейтинга лучших обновляется только командой
+# rebuild_leaderboard; её нужно запускать по расписанию, например cron:
+# 0 * * * * python manage.py rebuild_leaderboard
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=7),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=30),
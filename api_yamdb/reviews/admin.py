@@ -1,9 +1,22 @@
 from django.contrib import admin
 from reviews.models import Review, Comment
 from reviews.models import Category, Genre, Title, Genre_Title
+from reviews.search import COMMENT_INDEX, REVIEW_INDEX
 
 
-class ReviewAdmin(admin.ModelAdmin):
+class IndexedSearchMixin:
+    '''
+    Поиск в админке по полнотекстовому индексу вместо icontains.
+    '''
+    search_index = None
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return self.search_index.search(queryset, search_term), False
+
+
+class ReviewAdmin(IndexedSearchMixin, admin.ModelAdmin):
     list_display = (
         'title',
         'text',
@@ -13,11 +26,12 @@ class ReviewAdmin(admin.ModelAdmin):
     )
     list_editable = ('text', 'score')
     search_fields = ('text',)
+    search_index = REVIEW_INDEX
     list_filter = ('pub_date', 'author')
     empty_value_display = '-пусто-'
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(IndexedSearchMixin, admin.ModelAdmin):
     list_display = (
         'review',
         'text',
@@ -25,7 +39,8 @@ class CommentAdmin(admin.ModelAdmin):
         'pub_date'
     )
     list_editable = ('text',)
-    search_fields = ('text', 'author')
+    search_fields = ('text',)
+    search_index = COMMENT_INDEX
     list_filter = ('pub_date', 'author')
     empty_value_display = '-пусто-'
 
@@ -0,0 +1,129 @@
+import gzip
+import io
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from csv import DictReader, reader
+
+CHUNK_BYTES = 1024 * 1024
+GZIP_SUFFIX = '.gz'
+ENCODING = 'utf-8'
+NEWLINE = b'\n'
+QUOTE = b'"'
+FORMAT_DT = '%Y-%m-%dT%H:%M:%S.%fZ'
+
+
+def find_source(path, filename):
+    '''
+    Путь к файлу csv; если его нет, но есть сжатый gzip, то к сжатому.
+    '''
+    source = os.path.join(path, filename)
+    if not os.path.exists(source) and os.path.exists(source + GZIP_SUFFIX):
+        return source + GZIP_SUFFIX
+    return source
+
+
+def open_source(source):
+    '''
+    Двоичный файл для чтения; файлы .gz распаковываются на лету.
+    '''
+    if source.endswith(GZIP_SUFFIX):
+        return gzip.open(source, 'rb')
+    return open(source, 'rb')
+
+
+def open_target(target):
+    '''
+    Текстовый файл для записи csv; файлы .gz сжимаются на лету.
+    Время в заголовке gzip обнулено, чтобы одинаковые данные давали
+    одинаковые файлы.
+    '''
+    if target.endswith(GZIP_SUFFIX):
+        return io.TextIOWrapper(
+            gzip.GzipFile(target, 'wb', mtime=0),
+            encoding=ENCODING, newline=''
+        )
+    return open(target, 'w', encoding=ENCODING, newline='')
+
+
+def record_end(data):
+    '''
+    Конец последней полной записи в data, которые начинаются с границы
+    записи: перевод строки считается границей, только если число кавычек
+    до него чётное, поэтому переводы строк внутри текста не разрывают
+    запись. Если полной записи нет, возвращает 0.
+    '''
+    end = data.rfind(NEWLINE)
+    while end != -1 and data.count(QUOTE, 0, end) % 2:
+        end = data.rfind(NEWLINE, 0, end)
+    return end + 1
+
+
+def read_header(f):
+    '''
+    Имена столбцов из первой строки и смещение первой записи данных.
+    '''
+    line = f.readline()
+    return next(reader([line.decode(ENCODING)])), len(line)
+
+
+def iter_chunks(f, offset, chunk_bytes=CHUNK_BYTES):
+    '''
+    Куски файла из целых записей, начиная со смещения offset,
+    и смещение конца каждого куска.
+    '''
+    f.seek(offset)
+    tail = b''
+    while True:
+        block = f.read(chunk_bytes)
+        data = tail + block
+        if not block:
+            if data:
+                yield data, offset + len(data)
+            return
+        end = record_end(data)
+        if end:
+            offset += end
+            yield data[:end], offset
+        tail = data[end:]
+
+
+def parse_chunk(chunk, fieldnames):
+    '''
+    Строки куска в виде словарей, как у csv.DictReader.
+    '''
+    return list(DictReader(
+        io.StringIO(chunk.decode(ENCODING), newline=''),
+        fieldnames=fieldnames,
+    ))
+
+
+def read_rows(source, offset=0, workers=1, chunk_bytes=None):
+    '''
+    Строки файла csv пачками по кускам и смещение конца каждого куска.
+
+    При workers больше одного куски разбираются в пуле процессов,
+    а пачки отдаются в порядке файла одному потребителю; в работе
+    одновременно не больше двух кусков на процесс.
+    '''
+    with open_source(source) as f:
+        fieldnames, header_end = read_header(f)
+        chunks = iter_chunks(
+            f, max(offset, header_end), chunk_bytes or CHUNK_BYTES
+        )
+        if workers <= 1:
+            for chunk, end in chunks:
+                yield parse_chunk(chunk, fieldnames), end
+            return
+        with ProcessPoolExecutor(workers) as executor:
+            pending = deque()
+            for chunk, end in chunks:
+                pending.append(
+                    (executor.submit(parse_chunk, chunk, fieldnames), end)
+                )
+                if len(pending) >= workers * 2:
+                    future, end = pending.popleft()
+                    yield future.result(), end
+            while pending:
+                future, end = pending.popleft()
+                yield future.result(), end
@@ -0,0 +1,296 @@
+import json
+import math
+import statistics
+import tracemalloc
+from io import StringIO
+from time import perf_counter
+
+from django.conf import settings
+from django.contrib.auth.tokens import default_token_generator
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from reviews.management.commands.generate_dataset import WORDS
+from reviews.models import Review, Title, User
+
+DEFAULT_REQUESTS = 30
+DEFAULT_WARMUP = 3
+PERCENTILES = (50, 95, 99)
+DATASET_OPTIONS = (
+    ('seed', int, 0),
+    ('users', int, 200),
+    ('titles', int, 200),
+    ('reviews-per-title', float, 20),
+    ('comments-per-review', float, 2),
+)
+BENCHMARK_CACHE = {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    'LOCATION': 'benchmark',
+}
+LOCMEM_EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+
+
+def percentile(values, percent):
+    '''
+    Процентиль по методу ближайшего ранга.
+    '''
+    values = sorted(values)
+    return values[max(math.ceil(percent / 100 * len(values)) - 1, 0)]
+
+
+def send(client, method, path, data=None):
+    '''
+    Запрос тестовым клиентом с чтением всего ответа,
+    в том числе потокового.
+    '''
+    response = getattr(client, method)(path, data or {})
+    if response.streaming:
+        b''.join(response.streaming_content)
+    return response
+
+
+def auth_client(user):
+    return Client(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+
+
+def make_user(username, **kwargs):
+    return User.objects.create(
+        username=username, email=f'{username}@yamdb.fake', **kwargs
+    )
+
+
+def measure(case, start, count):
+    '''
+    Время ответа каждого из count запросов.
+    '''
+    timings = []
+    for i in range(start, start + count):
+        request = case(i)
+        started = perf_counter()
+        send(*request)
+        timings.append(perf_counter() - started)
+    return timings
+
+
+def profile(case, start, count):
+    '''
+    Число запросов к БД, выделенная память и коды ответов count запросов.
+    Замер отдельный, потому что tracemalloc сильно замедляет код.
+    '''
+    queries = []
+    allocated = []
+    statuses = {}
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    try:
+        for i in range(start, start + count):
+            request = case(i)
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            with CaptureQueriesContext(connection) as context:
+                response = send(*request)
+            allocated.append(tracemalloc.get_traced_memory()[1] - before)
+            queries.append(len(context.captured_queries))
+            code = str(response.status_code)
+            statuses[code] = statuses.get(code, 0) + 1
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+    return queries, allocated, statuses
+
+
+class Command(BaseCommand):
+    help = (
+        'Замер задержки, числа запросов к БД и выделенной памяти '
+        'для всех маршрутов API на сгенерированных данных'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=DEFAULT_REQUESTS,
+            help='Число замеряемых запросов к каждому маршруту'
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=DEFAULT_WARMUP,
+            help='Число запросов для прогрева перед замером'
+        )
+        parser.add_argument(
+            '--output', type=str,
+            help='Файл для результатов в JSON'
+        )
+        for name, kind, default in DATASET_OPTIONS:
+            parser.add_argument(
+                f'--{name}', type=kind, default=default,
+                help=f'Параметр --{name} команды generate_dataset'
+            )
+
+    def handle(self, *args, **kwargs):
+        '''
+        Основная функция выполнения команды.
+
+        Данные генерируются и все запросы выполняются в одной
+        транзакции, которая затем откатывается, поэтому база не
+        меняется. Кэш API и почта на время замера свои.
+        '''
+        requests = max(kwargs['requests'], 1)
+        dataset = {
+            name: kwargs[name.replace('-', '_')]
+            for name, _, _ in DATASET_OPTIONS
+        }
+        with override_settings(
+            CACHES={
+                **settings.CACHES,
+                settings.API_CACHE_ALIAS: BENCHMARK_CACHE,
+            },
+            EMAIL_BACKEND=LOCMEM_EMAIL_BACKEND,
+        ):
+            try:
+                with transaction.atomic():
+                    call_command('generate_dataset', *(
+                        arg for name, value in dataset.items()
+                        for arg in (f'--{name}', str(value))
+                    ), stdout=StringIO())
+                    routes = self.run_cases(
+                        max(kwargs['warmup'], 0), requests
+                    )
+                    transaction.set_rollback(True)
+            finally:
+                caches[settings.API_CACHE_ALIAS].clear()
+        report = {'dataset': dataset, 'requests': requests, 'routes': routes}
+        if kwargs['output']:
+            with open(kwargs['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+
+    def run_cases(self, warmup, requests):
+        '''
+        Прогрев, замер времени и профиль каждого маршрута.
+        '''
+        routes = {}
+        for name, (method, path, case) in self.get_cases().items():
+            measure(case, 0, warmup)
+            timings = measure(case, warmup, requests)
+            queries, allocated, statuses = profile(
+                case, warmup + requests, requests
+            )
+            result = {
+                'method': method.upper(),
+                'path': path,
+                **{
+                    f'p{percent}_ms': round(
+                        percentile(timings, percent) * 1000, 3
+                    )
+                    for percent in PERCENTILES
+                },
+                'queries': round(statistics.mean(queries), 2),
+                'allocated_bytes': round(statistics.median(allocated)),
+                'statuses': statuses,
+            }
+            routes[name] = result
+            self.stdout.write(
+                f'{name}: p50 {result["p50_ms"]:.1f} ms, '
+                f'p95 {result["p95_ms"]:.1f} ms, '
+                f'p99 {result["p99_ms"]:.1f} ms, '
+                f'{result["queries"]:g} queries, '
+                f'{result["allocated_bytes"]} bytes'
+            )
+        return routes
+
+    def get_cases(self):
+        '''
+        Маршруты API: метод, путь и функция, которая по номеру
+        запроса готовит клиент, метод, путь и данные запроса.
+        '''
+        review = Review.objects.annotate(
+            comments_count=Count('comments')
+        ).order_by('-comments_count', 'pk').select_related('title').first()
+        if review is None or not review.comments.exists():
+            raise CommandError('dataset has no comments')
+        title = Title.objects.order_by('-score_count', 'pk').first()
+        genre = title.genre.order_by('pk').first()
+        admin = make_user('benchmark-admin', role='admin')
+        user = make_user('benchmark-user')
+        token_user = make_user('benchmark-token')
+        code = default_token_generator.make_token(token_user)
+        anonymous = Client()
+        admin_client = auth_client(admin)
+        user_client = auth_client(user)
+        title_path = f'/api/v1/titles/{title.pk}/'
+        reviews_path = f'{title_path}reviews/'
+        comments_path = (
+            f'/api/v1/titles/{review.title_id}/reviews/{review.pk}/comments/'
+        )
+        comment = review.comments.order_by('pk').first()
+        word = WORDS[0]
+        filters = 'ordering=-rating'
+        if title.category_id:
+            filters += f'&category={title.category.slug}'
+        if genre is not None:
+            filters += f'&genre={genre.slug}'
+
+        def get(client, path):
+            return ('get', path, lambda i: (client, 'get', path))
+
+        def create_review(i):
+            client = auth_client(make_user(f'benchmark-reviewer{i}'))
+            return client, 'post', reviews_path, {'text': word, 'score': 5}
+
+        return {
+            'titles-list': get(anonymous, '/api/v1/titles/'),
+            'titles-filter': get(anonymous, f'/api/v1/titles/?{filters}'),
+            'titles-search': get(anonymous, f'/api/v1/titles/?search={word}'),
+            'titles-detail': get(anonymous, title_path),
+            'titles-top': get(anonymous, '/api/v1/titles/top/'),
+            'titles-facets': get(anonymous, '/api/v1/titles/facets/'),
+            'titles-histogram': get(anonymous, f'{title_path}histogram/'),
+            'reviews-list': get(anonymous, reviews_path),
+            'reviews-detail': get(
+                anonymous, f'{reviews_path}{title.reviews.first().pk}/'
+            ),
+            'reviews-search': get(
+                anonymous, f'/api/v1/reviews/search/?q={word}'
+            ),
+            'comments-list': get(anonymous, comments_path),
+            'comments-detail': get(
+                anonymous, f'{comments_path}{comment.pk}/'
+            ),
+            'comments-search': get(
+                anonymous, f'/api/v1/comments/search/?q={word}'
+            ),
+            'categories-list': get(anonymous, '/api/v1/categories/'),
+            'genres-list': get(anonymous, '/api/v1/genres/'),
+            'users-list': get(admin_client, '/api/v1/users/'),
+            'users-detail': get(
+                admin_client, f'/api/v1/users/{user.username}/'
+            ),
+            'users-me': get(user_client, '/api/v1/users/me/'),
+            'export-titles': get(admin_client, '/api/v1/export/titles.ndjson'),
+            'export-reviews': get(
+                admin_client, '/api/v1/export/reviews.ndjson'
+            ),
+            'export-comments': get(
+                admin_client, '/api/v1/export/comments.ndjson'
+            ),
+            'auth-signup': ('post', '/api/v1/auth/signup/', lambda i: (
+                anonymous, 'post', '/api/v1/auth/signup/', {
+                    'username': f'signup{i}',
+                    'email': f'signup{i}@yamdb.fake',
+                }
+            )),
+            'auth-token': ('post', '/api/v1/auth/token/', lambda i: (
+                anonymous, 'post', '/api/v1/auth/token/', {
+                    'username': token_user.username,
+                    'confirmation_code': code,
+                }
+            )),
+            'reviews-create': ('post', reviews_path, create_review),
+            'comments-create': ('post', comments_path, lambda i: (
+                user_client, 'post', comments_path, {'text': word}
+            )),
+        }
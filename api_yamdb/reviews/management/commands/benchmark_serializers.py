@@ -0,0 +1,97 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from api.serializers import (
+    COMPILED_CONTEXT,
+    CategorySerializer,
+    CommentSerializer,
+    GenreSerializer,
+    ReviewSerializer,
+    TitleSerializer,
+)
+from reviews.models import Category, Comment, Genre, Review, Title
+
+DEFAULT_LIMIT = 500
+DEFAULT_REPEAT = 20
+
+
+def serializer_cases():
+    '''
+    Сериализаторы списков и выборки, которые им передают представления.
+    '''
+    return (
+        ('titles', TitleSerializer, Title.objects.select_related(
+            'category'
+        ).prefetch_related('genre')),
+        ('reviews', ReviewSerializer, Review.objects.select_related('author')),
+        ('comments', CommentSerializer, Comment.objects.select_related(
+            'author'
+        )),
+        ('genres', GenreSerializer, Genre.objects.all()),
+        ('categories', CategorySerializer, Category.objects.all()),
+    )
+
+
+def render(serializer_class, objects, compiled):
+    serializer = serializer_class(
+        objects, many=True, context={COMPILED_CONTEXT: compiled}
+    )
+    return JSONRenderer().render(serializer.data)
+
+
+def measure(serializer_class, objects, compiled, repeat):
+    '''
+    Лучшее время сериализации и отрисовки списка из repeat попыток.
+    '''
+    best = None
+    for _ in range(repeat):
+        started = perf_counter()
+        render(serializer_class, objects, compiled)
+        elapsed = perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнение скорости обычной и быстрой сериализации списков '
+        'с проверкой побайтного совпадения JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit', type=int, default=DEFAULT_LIMIT,
+            help='Число объектов каждой модели'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=DEFAULT_REPEAT,
+            help='Число повторов каждого замера'
+        )
+
+    def handle(self, *args, **kwargs):
+        '''
+        Основная функция выполнения команды.
+        '''
+        for name, serializer_class, queryset in serializer_cases():
+            objects = list(queryset[:kwargs['limit']])
+            if not objects:
+                self.stdout.write(f'{name}: no objects')
+                continue
+            if render(serializer_class, objects, True) != render(
+                serializer_class, objects, False
+            ):
+                raise CommandError(f'{name}: JSON differs')
+            plain = measure(
+                serializer_class, objects, False, kwargs['repeat']
+            )
+            compiled = measure(
+                serializer_class, objects, True, kwargs['repeat']
+            )
+            self.stdout.write(
+                f'{name}: {len(objects)} objects, '
+                f'drf {len(objects) / plain:.0f} obj/s, '
+                f'compiled {len(objects) / compiled:.0f} obj/s, '
+                f'x{plain / compiled:.2f}'
+            )
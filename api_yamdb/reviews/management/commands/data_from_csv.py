@@ -1,15 +1,30 @@
 import os
 import datetime
 import logging
+from hashlib import md5
 from logging.handlers import RotatingFileHandler
+from contextlib import nullcontext
+from time import perf_counter
 
-from csv import DictReader
-from django.core.management.base import BaseCommand
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, transaction
+from django.utils import timezone
 
+from reviews import versions
+from reviews.csv_data import FORMAT_DT, find_source, read_rows
 from reviews.models import (
     Category, Genre, Title, Genre_Title,
     User,
     Review, Comment,
+    ImportCheckpoint, RowFingerprint,
+)
+from reviews.ratings import (
+    rebuild_leaderboard, recount_score_histograms, recount_title_scores
+)
+from reviews.search import (
+    COMMENT_INDEX, REVIEW_INDEX, SEARCH_INDEXES, TITLE_INDEX,
+    is_search_available
 )
 
 from api_yamdb.settings import BASE_DIR
@@ -32,6 +47,39 @@ LOG_STATUS = {
     'error': logging.ERROR,
     'default': logging.ERROR
 }
+DEFAULT_BATCH_SIZE = 1000
+IN_BATCH_SIZE = 500
+ROW_ERRORS = (LookupError, TypeError, ValueError, ValidationError)
+MODEL_INDEXES = {
+    Title: TITLE_INDEX, Review: REVIEW_INDEX, Comment: COMMENT_INDEX
+}
+
+
+def row_digest(row):
+    '''
+    md5 значений строки csv вместе с именами столбцов.
+    '''
+    return md5('\x1f'.join(
+        f'{name}\x1e{value}' for name, value in row.items()
+    ).encode()).hexdigest()
+
+
+def clean_row(model, row):
+    '''
+    Пустые значения полей, допускающих NULL, превращаются в None:
+    так dump_to_csv записывает NULL. Пустая строка в таком поле
+    после выгрузки и загрузки тоже станет NULL.
+    '''
+    for name, value in row.items():
+        if value == '' and model._meta.get_field(name).null:
+            row[name] = None
+    return row
+
+
+def parse_pub_date(value):
+    return timezone.make_aware(
+        datetime.datetime.strptime(value, FORMAT_DT), timezone.utc
+    )
 
 
 class Command(BaseCommand):
@@ -44,18 +92,54 @@ class Command(BaseCommand):
             '-log_level', type=str,
             help='Режим логгирования'
         )
+        parser.add_argument(
+            '--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+            help='Число строк в одном bulk_create'
+        )
+        parser.add_argument(
+            '--path', type=str, default=self.shift_path,
+            help='Папка с файлами csv или csv.gz'
+        )
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Продолжить с контрольных точек прерванной загрузки'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Число процессов для разбора csv'
+        )
+        parser.add_argument(
+            '--upsert', action='store_true',
+            help=(
+                'Добавить, изменить и удалить только строки, '
+                'хэш которых изменился с прошлой загрузки'
+            )
+        )
 
     def handle(self, *args, **kwargs):
         '''
         Основная функция выполнения команды.
         '''
-        print('start inserts')
+        self.stdout.write('start inserts')
         log_level = kwargs.get('log_level')
-        print('log_level', log_level)
         if log_level and log_level.lower() in (LOG_STATUS):
             logger.setLevel(LOG_STATUS[log_level.lower()])
         else:
             logger.setLevel(LOG_STATUS['default'])
+        self.batch_size = max(kwargs['batch_size'], 1)
+        self.path = kwargs['path']
+        self.resume = kwargs['resume']
+        self.workers = kwargs['workers']
+        self.upsert = kwargs['upsert']
+        if self.resume and self.upsert:
+            raise CommandError('--resume and --upsert are incompatible')
+        if not self.resume:
+            ImportCheckpoint.objects.all().delete()
+        self.ids = {}
+        self.seen = {}
+        self.fingerprints = {}
+        self.changed_titles = set()
+        self.changed_keys = set()
         self.insert_categories()
         self.insert_genres()
         self.insert_titles()
@@ -63,199 +147,422 @@ class Command(BaseCommand):
         self.insert_users()
         self.insert_reviews()
         self.insert_comments()
-        print('stop inserts')
+        if self.upsert:
+            self.delete_missing()
+        self.rebuild_derived()
+        versions.bump(
+            versions.CATEGORIES, versions.GENRES, versions.TITLES,
+            versions.USERS
+        )
+        self.bump_changed_keys()
+        ImportCheckpoint.objects.all().delete()
+        self.stdout.write('stop inserts')
+
+    def get_ids(self, model):
+        '''
+        Множество id модели в БД, загружается один раз.
+        '''
+        if model not in self.ids:
+            self.ids[model] = set(
+                model.objects.values_list('pk', flat=True).iterator()
+            )
+        return self.ids[model]
+
+    def get_id(self, model, value):
+        '''
+        id существующего объекта модели из значения csv.
+        '''
+        pk = int(value)
+        if pk not in self.get_ids(model):
+            raise LookupError(f'{model.__name__} {pk} does not exist')
+        return pk
+
+    def get_existing(self, model, unique):
+        '''
+        Уже занятые значения уникальных полей модели.
+        '''
+        return {
+            fields: {
+                tuple(key): pk for pk, *key in model.objects.values_list(
+                    'pk', *fields
+                ).iterator()
+            }
+            for fields in unique
+        }
+
+    def write(self, model, objs, save):
+        '''
+        Запись объектов одним вызовом save; если он не прошёл,
+        объекты пишутся по одному и отклонённые попадают в лог.
+        '''
+        if not objs:
+            return []
+        try:
+            with transaction.atomic():
+                save(objs)
+            return objs
+        except DatabaseError:
+            saved = []
+            for obj in objs:
+                try:
+                    with transaction.atomic():
+                        save((obj,))
+                    saved.append(obj)
+                except DatabaseError as err:
+                    logger.error(f'{model.__name__} {obj.pk}: {err}')
+            return saved
+
+    def save_batch(self, model, batch):
+        '''
+        Запись пачки: новые объекты через bulk_create, а в режиме
+        --upsert уже существующие через bulk_update.
+        '''
+        to_python = model._meta.pk.to_python
+        ids = self.get_ids(model)
+        new = [obj for obj in batch if to_python(obj.pk) not in ids]
+        saved = self.write(model, new, model.objects.bulk_create)
+        if self.upsert:
+            changed = [obj for obj in batch if to_python(obj.pk) in ids]
+            self.remember_old_titles(model, changed)
+            saved += self.write(model, changed, lambda objs: (
+                model.objects.bulk_update(objs, self.update_fields)
+            ))
+        ids.update(to_python(obj.pk) for obj in saved)
+        return saved
+
+    def remember_old_titles(self, model, objs):
+        '''
+        Произведения, от которых изменённые отзывы и жанры уходят,
+        тоже нужно пересчитать.
+        '''
+        if objs and model in (Review, Genre_Title):
+            self.changed_titles.update(model.objects.filter(
+                pk__in=[obj.pk for obj in objs]
+            ).values_list('title_id', flat=True))
+
+    def build_row(self, model, build, row, existing):
+        '''
+        Объект модели из строки csv с проверкой уникальных значений.
+        '''
+        obj = build(row)
+        keys = {
+            fields: tuple(
+                model._meta.get_field(name).to_python(
+                    getattr(obj, model._meta.get_field(name).attname)
+                )
+                for name in fields
+            )
+            for fields in existing
+        }
+        pk = model._meta.pk.to_python(obj.pk)
+        for fields, key in keys.items():
+            if existing[fields].get(key, pk) != pk or (
+                not self.upsert and key in existing[fields]
+            ):
+                raise ValueError(f'{", ".join(fields)} {key} already exists')
+        for fields, key in keys.items():
+            existing[fields][key] = pk
+        return obj
+
+    def get_fingerprints(self, model):
+        '''
+        Сохранённые хэши строк модели по id, загружаются один раз.
+        '''
+        if model not in self.fingerprints:
+            self.fingerprints[model] = dict(RowFingerprint.objects.filter(
+                table=model._meta.db_table
+            ).values_list('row_id', 'digest').iterator())
+        return self.fingerprints[model]
+
+    def changed_rows(self, model, rows):
+        '''
+        Строки, хэш которых отличается от сохранённого, и их хэши по id.
+        '''
+        fingerprints = self.get_fingerprints(model)
+        seen = self.seen.setdefault(model, set())
+        changed = []
+        digests = {}
+        for row in rows:
+            try:
+                pk = int(row['id'])
+            except (KeyError, TypeError, ValueError):
+                changed.append(row)
+                continue
+            seen.add(pk)
+            digest = row_digest(row)
+            if fingerprints.get(pk) != digest:
+                digests[pk] = digest
+                changed.append(row)
+        return changed, digests
+
+    def save_fingerprints(self, model, saved, digests):
+        '''
+        Запоминает хэши записанных строк и обновляет поисковый индекс.
+        '''
+        table = model._meta.db_table
+        pks = [int(obj.pk) for obj in saved]
+        for start in range(0, len(pks), IN_BATCH_SIZE):
+            RowFingerprint.objects.filter(
+                table=table, row_id__in=pks[start:start + IN_BATCH_SIZE]
+            ).delete()
+        RowFingerprint.objects.bulk_create((
+            RowFingerprint(table=table, row_id=pk, digest=digests[pk])
+            for pk in pks
+        ), batch_size=self.batch_size)
+        self.get_fingerprints(model).update(
+            (pk, digests[pk]) for pk in pks
+        )
+        index = MODEL_INDEXES.get(model)
+        if index is not None:
+            for obj in saved:
+                index.add(obj)
+
+    def insert_rows(self, model, build, rows, existing):
+        '''
+        Вставка строк одного куска файла пачками по batch_size.
+        В режиме --upsert строки с неизменным хэшем пропускаются.
+        Возвращает записанные объекты и число неизменных строк.
+        '''
+        total = len(rows)
+        if self.upsert:
+            rows, digests = self.changed_rows(model, rows)
+        saved = []
+        batch = []
+        for row in rows:
+            try:
+                batch.append(self.build_row(model, build, row, existing))
+            except ROW_ERRORS as err:
+                logger.error(f'{row}: {err}')
+            if len(batch) >= self.batch_size:
+                saved.extend(self.save_batch(model, batch))
+                batch = []
+        saved.extend(self.save_batch(model, batch))
+        if self.upsert:
+            self.save_fingerprints(model, saved, digests)
+        return saved, total - len(rows)
+
+    def get_checkpoint(self, source):
+        '''
+        Контрольная точка файла; без --resume загрузка идёт с начала.
+        '''
+        if not self.resume:
+            return ImportCheckpoint(source=source)
+        return ImportCheckpoint.objects.get_or_create(source=source)[0]
+
+    def save_checkpoint(self, checkpoint, offset, saved, rejected):
+        '''
+        Запоминает конец зафиксированного куска файла в режиме --resume.
+        '''
+        if not self.resume:
+            return
+        checkpoint.offset = offset
+        checkpoint.inserted += len(saved)
+        checkpoint.rejected += rejected
+        if saved:
+            last_id = max(int(obj.pk) for obj in saved)
+            checkpoint.last_id = max(checkpoint.last_id or last_id, last_id)
+        checkpoint.modified = timezone.now()
+        checkpoint.save()
+
+    def insert(self, filename, model, build, unique=(('id',),)):
+        '''
+        Вставка данных из csv в модель пачками в одной транзакции.
+
+        build превращает строку в объект модели; строки с ошибками,
+        ссылками на отсутствующие объекты и повторами уникальных
+        значений пропускаются и записываются в лог. В режиме --resume
+        каждый кусок файла фиксируется отдельно вместе с контрольной
+        точкой, и загрузка продолжается с её смещения.
+        '''
+        started = perf_counter()
+        inserted = rejected = unchanged = 0
+        source = find_source(self.path, filename)
+        logger.debug(source)
+        checkpoint = self.get_checkpoint(source)
+        table_transaction = nullcontext if self.resume else transaction.atomic
+        chunk_transaction = transaction.atomic if self.resume else nullcontext
+        with table_transaction():
+            existing = self.get_existing(model, unique)
+            for rows, offset in read_rows(
+                source, checkpoint.offset, self.workers
+            ):
+                if rows:
+                    self.update_fields = [
+                        name for name in rows[0] if name != 'id'
+                    ]
+                with chunk_transaction():
+                    saved, same = self.insert_rows(
+                        model, build, rows, existing
+                    )
+                    failed = len(rows) - len(saved) - same
+                    self.save_checkpoint(checkpoint, offset, saved, failed)
+                inserted += len(saved)
+                rejected += failed
+                unchanged += same
+        elapsed = perf_counter() - started
+        self.stdout.write(
+            f'{model.__name__}: {inserted} rows, {rejected} rejected, '
+            f'{unchanged} unchanged, '
+            f'{inserted / elapsed if elapsed else 0:.0f} rows/s'
+        )
+        return inserted, rejected
 
     def insert_categories(self):
         '''
         Вставка данных в модель Category.
         '''
-        logger.info('====START====')
-        filename = os.path.join(self.shift_path, 'category.csv')
-        logger.debug('filename')
-        logger.debug(filename)
-        with open(filename, 'r', encoding='utf-8') as f:
-            csvdict = DictReader(f)
-            for row in csvdict:
-                logger.info(row)
-                try:
-                    Category.objects.create(**row)
-                    logger.info('row inserts in database')
-                except Exception as err:
-                    logger.error(err)
-        logger.info('====STOP====')
+        return self.insert(
+            'category.csv', Category,
+            lambda row: Category(**clean_row(Category, row)),
+            (('id',), ('slug',))
+        )
 
     def insert_genres(self):
         '''
         Вставка данных в модель Genre.
         '''
-        logger.info('====START====')
-        filename = os.path.join(self.shift_path, 'genre.csv')
-        logger.debug('filename')
-        logger.debug(filename)
-        with open(filename, 'r', encoding='utf-8') as f:
-            csvdict = DictReader(f)
-            for row in csvdict:
-                logger.info(row)
-                try:
-                    Genre.objects.create(**row)
-                    logger.info('row inserts in database')
-                except Exception as err:
-                    logger.error(err)
-        logger.info('====STOP====')
+        return self.insert(
+            'genre.csv', Genre, lambda row: Genre(**clean_row(Genre, row)),
+            (('id',), ('slug',))
+        )
 
     def insert_titles(self):
         '''
         Вставка данных в модель Title.
         '''
-        logger.info('====START====')
-        filename = os.path.join(self.shift_path, 'titles.csv')
-        logger.debug('filename')
-        logger.debug(filename)
-        with open(filename, 'r', encoding='utf-8') as f:
-            csvdict = DictReader(f)
-            for row in csvdict:
-                logger.info(row)
-                try:
-                    num_category = int(row.pop('category'))
-                    logger.debug('num_category: ' + str(num_category))
-                    category = Category.objects.get(pk=num_category)
-                    logger.debug(category)
-                    if category:
-                        Title.objects.create(category=category, **row)
-                        logger.info('row inserts in database')
-                    else:
-                        logger.error(
-                            'category ' + str(num_category) + ' does not exist'
-                        )
-                except Exception as err:
-                    logger.error(err)
-        logger.info('====STOP====')
+        def build(row):
+            category = row.pop('category')
+            category_id = self.get_id(Category, category) if category else None
+            title = Title(category_id=category_id, **clean_row(Title, row))
+            self.changed_keys.add(versions.title_key(title.pk))
+            return title
+        return self.insert('titles.csv', Title, build)
 
     def insert_genge_titles(self):
         '''
         Вставка данных в модель Genre_Title.
         '''
-        logger.info('====START====')
-        filename = os.path.join(self.shift_path, 'genre_title.csv')
-        logger.debug('filename')
-        logger.debug(filename)
-        with open(filename, 'r', encoding='utf-8') as f:
-            csvdict = DictReader(f)
-            for row in csvdict:
-                logger.info(row)
-                try:
-                    genre_id = int(row.pop('genre_id'))
-                    logger.debug('genre_id: ' + str(genre_id))
-                    genre = Genre.objects.get(pk=genre_id)
-                    logger.debug(genre)
-                    title_id = int(row.pop('title_id'))
-                    logger.debug('title_id: ' + str(title_id))
-                    title = Title.objects.get(pk=title_id)
-                    logger.debug(title)
-                    if all((genre, title)):
-                        Genre_Title.objects.create(
-                            genre=genre, title=title, **row)
-                        logger.info('row inserts in database')
-                    else:
-                        logger.error("row doesn't insert")
-                except Exception as err:
-                    logger.error(err)
-        logger.info('====STOP====')
+        def build(row):
+            genre_title = Genre_Title(
+                id=row['id'],
+                genre_id=self.get_id(Genre, row['genre_id']),
+                title_id=self.get_id(Title, row['title_id']),
+            )
+            self.changed_titles.add(genre_title.title_id)
+            return genre_title
+        return self.insert(
+            'genre_title.csv', Genre_Title, build,
+            (('id',), ('title', 'genre'))
+        )
 
     def insert_users(self):
         '''
         Вставка данных в модель User.
         '''
-        logger.info('====START====')
-        filename = os.path.join(self.shift_path, 'users.csv')
-        logger.debug('filename')
-        logger.debug(filename)
-        with open(filename, 'r', encoding='utf-8') as f:
-            csvdict = DictReader(f)
-            for row in csvdict:
-                logger.info(row)
-                try:
-                    User.objects.create(**row)
-                    logger.info('row inserts in database')
-                except Exception as err:
-                    logger.error(err)
-        logger.info('====STOP====')
+        return self.insert(
+            'users.csv', User, lambda row: User(**clean_row(User, row)),
+            (('id',), ('username',), ('email',))
+        )
 
     def insert_reviews(self):
         '''
         Вставка данных в модель Review.
         '''
-        logger.info('====START====')
-        filename = os.path.join(self.shift_path, 'review.csv')
-        logger.debug('filename')
-        logger.debug(filename)
-        with open(filename, 'r', encoding='utf-8') as f:
-            csvdict = DictReader(f)
-            for row in csvdict:
-                logger.info(row)
-                try:
-                    format_dt = '%Y-%m-%dT%H:%M:%S.%fZ'
-                    logger.debug(f'format_dt: {format_dt}')
-                    dt = datetime.datetime.strptime(
-                        row.pop('pub_date'), format_dt)
-                    logger.debug(dt)
-                    title_id = int(row.pop('title_id'))
-                    logger.debug(f'title_id: {title_id}')
-                    title = Title.objects.get(pk=title_id)
-                    logger.debug(title)
-                    author_id = int(row.pop('author'))
-                    logger.debug(f'author_id: {author_id}')
-                    author = User.objects.get(pk=author_id)
-                    logger.debug(author)
-                    id = row.pop('id')
-                    logger.debug(f'id: {id}')
-                    text = row.pop('text')
-                    logger.debug(f'text: {text}')
-                    score = row.pop('score')
-                    logger.debug(f'score: {score}')
-                    if all((title, author, dt, text, score, id)):
-                        Review.objects.create(
-                            title=title, author=author, id=id,
-                            text=text, score=score, pub_date=dt)
-                        logger.info('row inserts in database')
-                    else:
-                        logger.error("row doesn't insert")
-                except Exception as err:
-                    logger.error(err)
-        logger.info('====STOP====')
+        score_field = Review._meta.get_field('score')
+
+        def build(row):
+            score = int(row['score'])
+            score_field.validate(score, None)
+            if not row['text']:
+                raise ValueError('empty text')
+            review = Review(
+                id=int(row['id']),
+                title_id=self.get_id(Title, row['title_id']),
+                author_id=self.get_id(User, row['author']),
+                text=row['text'],
+                score=score,
+                pub_date=parse_pub_date(row['pub_date']),
+            )
+            self.changed_titles.add(review.title_id)
+            return review
+        return self.insert(
+            'review.csv', Review, build, (('id',), ('author', 'title'))
+        )
 
     def insert_comments(self):
         '''
         Вставка данных в модель Comment.
         '''
-        logger.info('====START====')
-        filename = os.path.join(self.shift_path, 'comments.csv')
-        logger.debug('filename')
-        logger.debug(filename)
-        with open(filename, 'r', encoding='utf-8') as f:
-            csvdict = DictReader(f)
-            for row in csvdict:
-                logger.info(row)
-                try:
-                    format_dt = '%Y-%m-%dT%H:%M:%S.%fZ'
-                    logger.debug(f'format_dt: {format_dt}')
-                    dt = datetime.datetime.strptime(
-                        row.pop('pub_date'), format_dt)
-                    logger.debug(dt)
-                    review_id = int(row.pop('review_id'))
-                    logger.debug(f'review_id: {review_id}')
-                    review = Review.objects.get(pk=review_id)
-                    logger.debug(review)
-                    author_id = int(row.pop('author'))
-                    logger.debug(f'author_id: {author_id}')
-                    author = User.objects.get(pk=author_id)
-                    logger.debug(author)
-                    if all((review, author, dt)):
-                        Comment.objects.create(
-                            review=review, author=author, pub_date=dt, **row)
-                        logger.info('row inserts in database')
-                    else:
-                        logger.error("row doesn't insert")
-                except Exception as err:
-                    logger.error(err)
-        logger.info('====STOP====')
+        def build(row):
+            comment = Comment(
+                id=int(row['id']),
+                review_id=self.get_id(Review, row['review_id']),
+                author_id=self.get_id(User, row['author']),
+                text=row['text'],
+                pub_date=parse_pub_date(row['pub_date']),
+            )
+            self.changed_keys.add(
+                versions.review_comments_key(comment.review_id)
+            )
+            return comment
+        return self.insert('comments.csv', Comment, build)
+
+    def delete_missing(self):
+        '''
+        Удаляет объекты, строки которых пропали из файлов с прошлой
+        загрузки, начиная с зависимых таблиц. Удаление идёт через ORM,
+        поэтому сигналы пересчитывают оценки, индексы и версии.
+        '''
+        for model in reversed(tuple(self.seen)):
+            missing = sorted(
+                set(self.get_fingerprints(model)) - self.seen[model]
+            )
+            deleted = 0
+            for start in range(0, len(missing), IN_BATCH_SIZE):
+                with transaction.atomic():
+                    deleted += model.objects.filter(
+                        pk__in=missing[start:start + IN_BATCH_SIZE]
+                    ).delete()[1].get(model._meta.label, 0)
+            self.stdout.write(f'{model.__name__}: {deleted} deleted')
+        for model in self.seen:
+            RowFingerprint.objects.filter(
+                table=model._meta.db_table
+            ).exclude(row_id__in=model.objects.values('pk')).delete()
+
+    def rebuild_derived(self):
+        '''
+        bulk_create не вызывает сигналы, поэтому оценки, распределения,
+        рейтинг лучших и поисковые индексы пересчитываются целиком;
+        в режиме --upsert только для изменённых произведений.
+        '''
+        if not self.upsert:
+            with transaction.atomic():
+                recount_title_scores()
+                rebuild_leaderboard()
+                recount_score_histograms()
+                if is_search_available():
+                    for index in SEARCH_INDEXES:
+                        index.rebuild()
+            return
+        title_ids = sorted(self.changed_titles)
+        with transaction.atomic():
+            for start in range(0, len(title_ids), IN_BATCH_SIZE):
+                titles = Title.objects.filter(
+                    pk__in=title_ids[start:start + IN_BATCH_SIZE]
+                )
+                recount_title_scores(titles)
+                recount_score_histograms(titles)
+            rebuild_leaderboard()
+
+    def bump_changed_keys(self):
+        '''
+        Меняет версии изменённых произведений, их отзывов и комментариев,
+        чтобы закэшированные представления устарели.
+        '''
+        keys = set(self.changed_keys)
+        for title_id in self.changed_titles:
+            keys.add(versions.title_key(title_id))
+            keys.add(versions.title_reviews_key(title_id))
+        keys = sorted(keys)
+        for start in range(0, len(keys), IN_BATCH_SIZE):
+            versions.bump(*keys[start:start + IN_BATCH_SIZE])
@@ -0,0 +1,127 @@
+import csv
+import datetime
+import os
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+from django.db import connections, transaction
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from reviews.csv_data import FORMAT_DT, GZIP_SUFFIX, open_target
+from reviews.models import (
+    Category, Genre, Title, Genre_Title,
+    User,
+    Review, Comment,
+)
+
+DEFAULT_BATCH_SIZE = 2000
+TABLES = (
+    ('category.csv', Category, ('id', 'name', 'slug')),
+    ('genre.csv', Genre, ('id', 'name', 'slug')),
+    ('titles.csv', Title, ('id', 'name', 'year', 'category', 'description')),
+    ('genre_title.csv', Genre_Title, ('id', 'title_id', 'genre_id')),
+    ('users.csv', User, (
+        'id', 'username', 'email', 'role', 'bio', 'first_name', 'last_name',
+        'password', 'is_superuser', 'is_staff', 'is_active',
+        'date_joined', 'last_login',
+    )),
+    ('review.csv', Review, (
+        'id', 'title_id', 'text', 'author', 'score', 'pub_date'
+    )),
+    ('comments.csv', Comment, (
+        'id', 'review_id', 'text', 'author', 'pub_date'
+    )),
+)
+
+
+def format_value(value):
+    '''
+    Значение для csv: даты в UTC в формате, который читает data_from_csv;
+    NULL записывается пустой строкой.
+    '''
+    if isinstance(value, datetime.datetime):
+        return value.astimezone(timezone.utc).strftime(FORMAT_DT)
+    return value
+
+
+def dump_table(target, model, columns, batch_size):
+    '''
+    Запись таблицы в csv по порядку id. Строки читаются из БД
+    курсором кусками по batch_size, поэтому память не растёт
+    с размером таблицы. Возвращает число строк и время выгрузки.
+    '''
+    started = perf_counter()
+    count = 0
+    with open_target(target) as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(columns)
+        for row in model.objects.order_by('pk').values_list(
+            *columns
+        ).iterator(chunk_size=batch_size):
+            writer.writerow([format_value(value) for value in row])
+            count += 1
+    return count, perf_counter() - started
+
+
+def dump_table_in_thread(*args):
+    '''
+    Выгрузка таблицы в отдельном потоке со своим соединением с БД,
+    которое закрывается по окончании.
+    '''
+    try:
+        return dump_table(*args)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Выгрузка данных в csv в формате data_from_csv'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path', type=str, required=True,
+            help='Папка для файлов csv'
+        )
+        parser.add_argument(
+            '--gzip', action='store_true',
+            help='Сжимать файлы в csv.gz'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help=(
+                'Число таблиц, выгружаемых одновременно в своих потоках '
+                'и соединениях с БД; по умолчанию все таблицы читаются '
+                'в одной транзакции'
+            )
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+            help='Число строк, читаемых из БД за раз'
+        )
+
+    def handle(self, *args, **kwargs):
+        '''
+        Основная функция выполнения команды.
+        '''
+        path = kwargs['path']
+        os.makedirs(path, exist_ok=True)
+        suffix = GZIP_SUFFIX if kwargs['gzip'] else ''
+        jobs = [
+            (os.path.join(path, filename + suffix), model, columns,
+             max(kwargs['batch_size'], 1))
+            for filename, model, columns in TABLES
+        ]
+        if kwargs['workers'] > 1:
+            with ThreadPoolExecutor(kwargs['workers']) as executor:
+                results = list(executor.map(
+                    lambda job: dump_table_in_thread(*job), jobs
+                ))
+        else:
+            with transaction.atomic():
+                results = [dump_table(*job) for job in jobs]
+        for (_, model, _, _), (count, elapsed) in zip(jobs, results):
+            self.stdout.write(
+                f'{model.__name__}: {count} rows, '
+                f'{count / elapsed if elapsed else 0:.0f} rows/s'
+            )
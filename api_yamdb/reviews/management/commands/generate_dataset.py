@@ -0,0 +1,309 @@
+import datetime
+import random
+from itertools import islice
+from time import perf_counter
+
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from reviews import versions
+from reviews.models import (
+    Category, Genre, Title, Genre_Title,
+    User,
+    Review, Comment,
+)
+from reviews.ratings import (
+    rebuild_leaderboard, recount_score_histograms, recount_title_scores
+)
+from reviews.search import SEARCH_INDEXES, is_search_available
+
+DEFAULT_BATCH_SIZE = 1000
+START_DATE = datetime.datetime(2020, 1, 1, tzinfo=timezone.utc)
+PERIOD_SECONDS = 365 * 24 * 60 * 60
+FIRST_YEAR = 1900
+LAST_YEAR = 2020
+WORDS = (
+    'фильм', 'книга', 'сюжет', 'герой', 'автор', 'финал', 'музыка',
+    'история', 'актёр', 'режиссёр', 'роман', 'сцена', 'отличный',
+    'скучный', 'странный', 'красивый', 'долгий', 'смешной', 'грустный',
+    'рекомендую', 'пересматривал', 'прочитал', 'понравился', 'ожидал',
+    'больше', 'меньше', 'очень', 'совсем', 'снова', 'никогда',
+)
+SCORE_WEIGHTS = (1, 1, 2, 3, 5, 7, 10, 12, 10, 8)
+
+
+def zipf_counts(total, size, skew, limit):
+    '''
+    Раскладка total элементов по size местам по закону Ципфа:
+    место r получает долю 1 / r ** skew, но не больше limit.
+    При skew = 0 все места получают поровну.
+    '''
+    weights = [1 / rank ** skew for rank in range(1, size + 1)]
+    scale = total / sum(weights) if weights else 0
+    return [min(limit, round(weight * scale)) for weight in weights]
+
+
+def make_text(rng, low, high):
+    return ' '.join(rng.choices(WORDS, k=rng.randint(low, high))).capitalize()
+
+
+def make_date(rng):
+    return START_DATE + datetime.timedelta(
+        seconds=rng.randrange(PERIOD_SECONDS),
+        microseconds=rng.randrange(1000000),
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Генерация воспроизводимого набора данных заданного размера '
+        'для проверки под нагрузкой'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Зерно генератора; одно зерно даёт одни и те же данные'
+        )
+        parser.add_argument(
+            '--users', type=int, default=1000, help='Число пользователей'
+        )
+        parser.add_argument(
+            '--categories', type=int, default=10, help='Число категорий'
+        )
+        parser.add_argument(
+            '--genres', type=int, default=30, help='Число жанров'
+        )
+        parser.add_argument(
+            '--titles', type=int, default=1000, help='Число произведений'
+        )
+        parser.add_argument(
+            '--genres-per-title', type=int, default=2,
+            help='Число жанров у произведения'
+        )
+        parser.add_argument(
+            '--reviews-per-title', type=float, default=20,
+            help='Среднее число отзывов на произведение'
+        )
+        parser.add_argument(
+            '--skew', type=float, default=1.0,
+            help=(
+                'Показатель закона Ципфа для числа отзывов '
+                'на произведения; 0 - поровну'
+            )
+        )
+        parser.add_argument(
+            '--comments-per-review', type=float, default=2,
+            help='Среднее число комментариев к отзыву'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+            help='Число строк в одном bulk_create'
+        )
+
+    def handle(self, *args, **kwargs):
+        '''
+        Основная функция выполнения команды.
+        '''
+        self.seed = kwargs['seed']
+        self.batch_size = max(kwargs['batch_size'], 1)
+        categories = self.generate_categories(kwargs['categories'])
+        genres = self.generate_genres(kwargs['genres'])
+        users = self.generate_users(kwargs['users'])
+        titles = self.generate_titles(kwargs['titles'], categories)
+        self.generate_genre_titles(
+            titles, genres, kwargs['genres_per_title']
+        )
+        reviews = self.generate_reviews(
+            titles, users, kwargs['reviews_per_title'], kwargs['skew']
+        )
+        self.generate_comments(
+            reviews, users, kwargs['comments_per_review']
+        )
+        self.rebuild_derived()
+        versions.bump(
+            versions.CATEGORIES, versions.GENRES, versions.TITLES,
+            versions.USERS
+        )
+
+    def get_rng(self, name):
+        '''
+        Свой генератор для каждой таблицы, чтобы размеры одной таблицы
+        не меняли содержимое другой.
+        '''
+        return random.Random(f'{self.seed}:{name}')
+
+    def first_id(self, model):
+        '''
+        Первый свободный id: новые строки добавляются после имеющихся.
+        '''
+        return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+    def insert(self, model, objs):
+        '''
+        Вставка объектов из итератора пачками по batch_size
+        в одной транзакции.
+        '''
+        started = perf_counter()
+        count = 0
+        objs = iter(objs)
+        with transaction.atomic():
+            while True:
+                batch = list(islice(objs, self.batch_size))
+                if not batch:
+                    break
+                model.objects.bulk_create(batch)
+                count += len(batch)
+        elapsed = perf_counter() - started
+        self.stdout.write(
+            f'{model.__name__}: {count} rows, '
+            f'{count / elapsed if elapsed else 0:.0f} rows/s'
+        )
+
+    def generate_categories(self, count):
+        '''
+        Категории; возвращает диапазон их id.
+        '''
+        first = self.first_id(Category)
+        ids = range(first, first + count)
+        self.insert(Category, (
+            Category(id=pk, name=f'Категория {pk}', slug=f'category-{pk}')
+            for pk in ids
+        ))
+        return ids
+
+    def generate_genres(self, count):
+        '''
+        Жанры; возвращает диапазон их id.
+        '''
+        first = self.first_id(Genre)
+        ids = range(first, first + count)
+        self.insert(Genre, (
+            Genre(id=pk, name=f'Жанр {pk}', slug=f'genre-{pk}')
+            for pk in ids
+        ))
+        return ids
+
+    def generate_users(self, count):
+        '''
+        Пользователи без пароля; возвращает диапазон их id.
+        '''
+        first = self.first_id(User)
+        ids = range(first, first + count)
+        self.insert(User, (
+            User(
+                id=pk,
+                username=f'user{pk}',
+                email=f'user{pk}@yamdb.fake',
+                password=UNUSABLE_PASSWORD_PREFIX,
+                date_joined=START_DATE,
+            )
+            for pk in ids
+        ))
+        return ids
+
+    def generate_titles(self, count, categories):
+        '''
+        Произведения со случайными годом и категорией;
+        возвращает диапазон их id.
+        '''
+        rng = self.get_rng('titles')
+        first = self.first_id(Title)
+        ids = range(first, first + count)
+        self.insert(Title, (
+            Title(
+                id=pk,
+                name=f'Произведение {pk}',
+                year=rng.randint(FIRST_YEAR, LAST_YEAR),
+                description=make_text(rng, 5, 20),
+                category_id=rng.choice(categories) if categories else None,
+            )
+            for pk in ids
+        ))
+        return ids
+
+    def generate_genre_titles(self, titles, genres, per_title):
+        '''
+        Разные случайные жанры каждого произведения.
+        '''
+        rng = self.get_rng('genre_titles')
+        per_title = min(max(per_title, 0), len(genres))
+
+        def objs():
+            pk = self.first_id(Genre_Title)
+            for title_id in titles:
+                for genre_id in rng.sample(genres, per_title):
+                    yield Genre_Title(
+                        id=pk, title_id=title_id, genre_id=genre_id
+                    )
+                    pk += 1
+        self.insert(Genre_Title, objs())
+
+    def generate_reviews(self, titles, users, per_title, skew):
+        '''
+        Отзывы разных авторов; их число на произведение убывает
+        по закону Ципфа, а самые популярные произведения выбираются
+        случайно. Возвращает диапазон id отзывов.
+        '''
+        rng = self.get_rng('reviews')
+        order = list(titles)
+        rng.shuffle(order)
+        counts = zipf_counts(
+            round(per_title * len(titles)), len(order), skew, len(users)
+        )
+        first = self.first_id(Review)
+
+        def objs():
+            pk = first
+            for title_id, count in zip(order, counts):
+                for author_id in rng.sample(users, count):
+                    yield Review(
+                        id=pk,
+                        title_id=title_id,
+                        author_id=author_id,
+                        text=make_text(rng, 5, 50),
+                        score=rng.choices(
+                            range(1, 11), weights=SCORE_WEIGHTS
+                        )[0],
+                        pub_date=make_date(rng),
+                    )
+                    pk += 1
+        self.insert(Review, objs())
+        return range(first, first + sum(counts))
+
+    def generate_comments(self, reviews, users, per_review):
+        '''
+        Комментарии случайных авторов, в среднем per_review на отзыв.
+        '''
+        rng = self.get_rng('comments')
+        high = round(per_review * 2)
+
+        def objs():
+            pk = self.first_id(Comment)
+            for review_id in reviews:
+                for _ in range(rng.randint(0, high)):
+                    yield Comment(
+                        id=pk,
+                        review_id=review_id,
+                        author_id=rng.choice(users),
+                        text=make_text(rng, 3, 20),
+                        pub_date=make_date(rng),
+                    )
+                    pk += 1
+        self.insert(Comment, objs())
+
+    def rebuild_derived(self):
+        '''
+        bulk_create не вызывает сигналы, поэтому оценки, распределения,
+        рейтинг лучших и поисковые индексы пересчитываются целиком.
+        '''
+        with transaction.atomic():
+            recount_title_scores()
+            rebuild_leaderboard()
+            recount_score_histograms()
+            if is_search_available():
+                for index in SEARCH_INDEXES:
+                    index.rebuild()
@@ -0,0 +1,116 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from api.filters import TitleFilter
+from reviews.models import Category, Comment, Genre, Review, Title, User
+
+SAMPLE_ID = 1
+SAMPLE_SLUG = 'slug'
+SAMPLE_YEAR = 2000
+PAGE_SIZE = 10
+
+
+def title_filter(params):
+    titles = Title.objects.select_related('category')
+    return TitleFilter(params, queryset=titles).qs[:PAGE_SIZE]
+
+
+def query_shapes():
+    '''
+    Запросы, которые выполняет API, с типичными значениями параметров.
+    '''
+    now = timezone.now()
+    return (
+        ('titles list', title_filter({})),
+        ('titles by category', title_filter({'category': SAMPLE_SLUG})),
+        ('titles by genre', title_filter({'genre': SAMPLE_SLUG})),
+        ('titles by year', title_filter({'year': SAMPLE_YEAR})),
+        ('titles by category and year', title_filter(
+            {'category': SAMPLE_SLUG, 'year': SAMPLE_YEAR}
+        )),
+        ('titles by rating', title_filter({'ordering': '-rating'})),
+        ('titles by reviews count', title_filter(
+            {'ordering': '-reviews_count'}
+        )),
+        ('titles by year desc', title_filter({'ordering': '-year'})),
+        ('title genres', Genre.objects.filter(
+            title__in=(SAMPLE_ID, SAMPLE_ID + 1)
+        )),
+        ('top titles', Title.objects.filter(rank__isnull=False).order_by(
+            '-rank__weighted_rating', 'pk'
+        )[:50]),
+        ('title reviews', Review.objects.filter(
+            title_id=SAMPLE_ID
+        )[:PAGE_SIZE]),
+        ('title reviews after cursor', Review.objects.filter(
+            Q(pub_date__lt=now) | Q(pub_date=now, pk__lt=SAMPLE_ID),
+            title_id=SAMPLE_ID,
+        ).order_by('-pub_date', '-pk')[:PAGE_SIZE + 1]),
+        ('author review of title', Review.objects.filter(
+            author_id=SAMPLE_ID, title_id=SAMPLE_ID
+        )),
+        ('review comments', Comment.objects.filter(
+            review_id=SAMPLE_ID
+        )[:PAGE_SIZE]),
+        ('review comments after cursor', Comment.objects.filter(
+            Q(pub_date__lt=now) | Q(pub_date=now, pk__lt=SAMPLE_ID),
+            review_id=SAMPLE_ID,
+        ).order_by('-pub_date', '-pk')[:PAGE_SIZE + 1]),
+        ('categories list', Category.objects.all()[:PAGE_SIZE]),
+        ('category by slug', Category.objects.filter(slug=SAMPLE_SLUG)),
+        ('genres list', Genre.objects.all()[:PAGE_SIZE]),
+        ('genre by slug', Genre.objects.filter(slug=SAMPLE_SLUG)),
+        ('users list', User.objects.all()[:PAGE_SIZE]),
+        ('user by username', User.objects.filter(username=SAMPLE_SLUG)),
+    )
+
+
+def is_full_scan(detail):
+    '''
+    Строка плана SQLite с перебором всей таблицы без индекса.
+    '''
+    return (
+        detail.startswith('SCAN ')
+        and 'USING' not in detail
+        and 'VIRTUAL TABLE' not in detail
+        and 'CONSTANT ROW' not in detail
+    )
+
+
+class Command(BaseCommand):
+    help = 'Проверка планов запросов API на полный перебор таблиц'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--strict', action='store_true',
+            help='Завершиться с ошибкой при полном переборе таблицы'
+        )
+
+    def handle(self, *args, **kwargs):
+        '''
+        Основная функция выполнения команды.
+        '''
+        if connection.vendor != 'sqlite':
+            raise CommandError('EXPLAIN QUERY PLAN поддерживается для SQLite')
+        full_scans = []
+        with connection.cursor() as cursor:
+            for name, queryset in query_shapes():
+                sql, params = queryset.query.sql_with_params()
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                details = [row[-1] for row in cursor.fetchall()]
+                scans = [detail for detail in details if is_full_scan(detail)]
+                status = (
+                    self.style.ERROR('FULL SCAN') if scans
+                    else self.style.SUCCESS('OK')
+                )
+                self.stdout.write(f'{name}: {status}')
+                for detail in details:
+                    self.stdout.write(f'    {detail}')
+                full_scans.extend(f'{name}: {scan}' for scan in scans)
+        if full_scans and kwargs['strict']:
+            raise CommandError(
+                'full scans found:\n' + '\n'.join(full_scans)
+            )
+        self.stdout.write(f'full scans: {len(full_scans)}')
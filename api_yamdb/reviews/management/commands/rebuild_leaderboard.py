@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from reviews import versions
+from reviews.models import TitleRank
+from reviews.ratings import rebuild_leaderboard
+
+
+class Command(BaseCommand):
+    help = (
+        'Перестроение рейтинга лучших произведений со свежей средней '
+        'оценкой; запускается по расписанию'
+    )
+
+    def handle(self, *args, **kwargs):
+        '''
+        Основная функция выполнения команды.
+        '''
+        with transaction.atomic():
+            rebuild_leaderboard()
+            versions.bump(versions.TITLES)
+        self.stdout.write(f'ranked titles: {TitleRank.objects.count()}')
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from reviews.search import SEARCH_INDEXES, is_search_available
+
+
+class Command(BaseCommand):
+    help = 'Перестроение полнотекстовых индексов'
+
+    def handle(self, *args, **kwargs):
+        '''
+        Основная функция выполнения команды.
+        '''
+        if not is_search_available():
+            self.stdout.write('full-text search is not supported')
+            return
+        with transaction.atomic():
+            for index in SEARCH_INDEXES:
+                index.rebuild()
+                self.stdout.write(f'{index.table} rebuilt')
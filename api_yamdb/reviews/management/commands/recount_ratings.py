@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from reviews import versions
+from reviews.models import Title
+from reviews.ratings import (
+    rebuild_leaderboard, recount_score_histograms, recount_title_scores
+)
+
+BUMP_BATCH_SIZE = 500
+
+
+def title_scores():
+    '''
+    Сумма, количество оценок и рейтинг каждого произведения.
+    '''
+    return {
+        pk: scores for pk, *scores in Title.objects.values_list(
+            'pk', 'score_sum', 'score_count', 'rating'
+        ).iterator()
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчёт оценок произведений, распределений оценок '
+        'и рейтинга лучших'
+    )
+
+    def handle(self, *args, **kwargs):
+        '''
+        Основная функция выполнения команды.
+        '''
+        with transaction.atomic():
+            before = title_scores()
+            updated = recount_title_scores()
+            rebuild_leaderboard()
+            recount_score_histograms()
+            changed = sorted(
+                pk for pk, scores in title_scores().items()
+                if before.get(pk) != scores
+            )
+            versions.bump(versions.TITLES)
+            for start in range(0, len(changed), BUMP_BATCH_SIZE):
+                versions.bump(*(
+                    versions.title_key(pk)
+                    for pk in changed[start:start + BUMP_BATCH_SIZE]
+                ))
+        self.stdout.write(
+            f'recounted titles: {updated}, changed: {len(changed)}'
+        )
@@ -0,0 +1,70 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:59
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+import django.db.models.deletion
+
+
+def fill_leaderboard(apps, schema_editor):
+    Title = apps.get_model('reviews', 'Title')
+    TitleRank = apps.get_model('reviews', 'TitleRank')
+    ScoreTotal = apps.get_model('reviews', 'ScoreTotal')
+    totals = Title.objects.aggregate(
+        score_sum=Sum('score_sum'), score_count=Sum('score_count')
+    )
+    score_sum = totals['score_sum'] or 0
+    score_count = totals['score_count'] or 0
+    ScoreTotal.objects.create(
+        pk=1, score_sum=score_sum, score_count=score_count
+    )
+    mean = score_sum / score_count if score_count else 0
+    weight = settings.LEADERBOARD_PRIOR_WEIGHT
+    TitleRank.objects.bulk_create(
+        TitleRank(
+            title_id=title_id,
+            weighted_rating=(title_sum + weight * mean) / (title_count + weight),
+        )
+        for title_id, title_sum, title_count in Title.objects.filter(
+            score_count__gt=0
+        ).values_list('pk', 'score_sum', 'score_count')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_title_rating_ordering'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoreTotal',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score_sum', models.PositiveIntegerField(default=0, help_text='Сумма оценок всех отзывов', verbose_name='Сумма оценок')),
+                ('score_count', models.PositiveIntegerField(default=0, help_text='Количество всех отзывов', verbose_name='Количество оценок')),
+            ],
+            options={
+                'verbose_name': 'Сумма оценок',
+                'verbose_name_plural': 'Суммы оценок',
+            },
+        ),
+        migrations.CreateModel(
+            name='TitleRank',
+            fields=[
+                ('title', models.OneToOneField(help_text='Произведение', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rank', serialize=False, to='reviews.Title', verbose_name='Произведение')),
+                ('weighted_rating', models.FloatField(help_text='Средняя оценка, сглаженная к средней по всем отзывам', verbose_name='Взвешенный рейтинг')),
+            ],
+            options={
+                'verbose_name': 'Позиция в рейтинге',
+                'verbose_name_plural': 'Рейтинг лучших произведений',
+                'ordering': ('-weighted_rating', 'title'),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='titlerank',
+            index=models.Index(fields=['weighted_rating'], name='rank_weighted_rating_idx'),
+        ),
+        migrations.RunPython(fill_leaderboard, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:00
+
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def fill_histograms(apps, schema_editor):
+    Review = apps.get_model('reviews', 'Review')
+    ScoreHistogram = apps.get_model('reviews', 'ScoreHistogram')
+    histograms = {}
+    counts = Review.objects.order_by().values('title', 'score').annotate(
+        total=Count('pk')
+    )
+    for row in counts:
+        histogram = histograms.setdefault(
+            row['title'], ScoreHistogram(title_id=row['title'])
+        )
+        setattr(histogram, f'score_{row["score"]}', row['total'])
+    ScoreHistogram.objects.bulk_create(histograms.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0006_leaderboard'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoreHistogram',
+            fields=[
+                ('title', models.OneToOneField(help_text='Произведение', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='histogram', serialize=False, to='reviews.Title', verbose_name='Произведение')),
+                ('score_1', models.PositiveIntegerField(default=0, help_text='Количество отзывов с оценкой 1', verbose_name='Оценка 1')),
+                ('score_2', models.PositiveIntegerField(default=0, help_text='Количество отзывов с оценкой 2', verbose_name='Оценка 2')),
+                ('score_3', models.PositiveIntegerField(default=0, help_text='Количество отзывов с оценкой 3', verbose_name='Оценка 3')),
+                ('score_4', models.PositiveIntegerField(default=0, help_text='Количество отзывов с оценкой 4', verbose_name='Оценка 4')),
+                ('score_5', models.PositiveIntegerField(default=0, help_text='Количество отзывов с оценкой 5', verbose_name='Оценка 5')),
+                ('score_6', models.PositiveIntegerField(default=0, help_text='Количество отзывов с оценкой 6', verbose_name='Оценка 6')),
+                ('score_7', models.PositiveIntegerField(default=0, help_text='Количество отзывов с оценкой 7', verbose_name='Оценка 7')),
+                ('score_8', models.PositiveIntegerField(default=0, help_text='Количество отзывов с оценкой 8', verbose_name='Оценка 8')),
+                ('score_9', models.PositiveIntegerField(default=0, help_text='Количество отзывов с оценкой 9', verbose_name='Оценка 9')),
+                ('score_10', models.PositiveIntegerField(default=0, help_text='Количество отзывов с оценкой 10', verbose_name='Оценка 10')),
+            ],
+            options={
+                'verbose_name': 'Распределение оценок',
+                'verbose_name_plural': 'Распределения оценок',
+            },
+        ),
+        migrations.RunPython(fill_histograms, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:05
+
+from django.db import migrations
+
+from reviews.search import TITLE_INDEX, is_search_available
+
+
+def create_index(apps, schema_editor):
+    if is_search_available(schema_editor.connection):
+        TITLE_INDEX.create(schema_editor.connection)
+        TITLE_INDEX.rebuild(schema_editor.connection)
+
+
+def drop_index(apps, schema_editor):
+    if is_search_available(schema_editor.connection):
+        TITLE_INDEX.drop(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0008_pub_date_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
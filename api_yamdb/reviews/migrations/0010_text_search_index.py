@@ -0,0 +1,29 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:10
+
+from django.db import migrations
+
+from reviews.search import COMMENT_INDEX, REVIEW_INDEX, is_search_available
+
+
+def create_indexes(apps, schema_editor):
+    if is_search_available(schema_editor.connection):
+        for index in (REVIEW_INDEX, COMMENT_INDEX):
+            index.create(schema_editor.connection)
+            index.rebuild(schema_editor.connection)
+
+
+def drop_indexes(apps, schema_editor):
+    if is_search_available(schema_editor.connection):
+        for index in (REVIEW_INDEX, COMMENT_INDEX):
+            index.drop(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0009_title_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
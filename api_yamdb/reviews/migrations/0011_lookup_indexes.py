@@ -0,0 +1,40 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:07
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def delete_duplicate_genres(apps, schema_editor):
+    Genre_Title = apps.get_model('reviews', 'Genre_Title')
+    duplicates = Genre_Title.objects.order_by().values(
+        'title', 'genre'
+    ).annotate(first_id=Min('pk'), total=Count('pk')).filter(total__gt=1)
+    for row in duplicates:
+        Genre_Title.objects.filter(
+            title=row['title'], genre=row['genre']
+        ).exclude(pk=row['first_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0010_text_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            delete_duplicate_genres, migrations.RunPython.noop
+        ),
+        migrations.AddIndex(
+            model_name='genre_title',
+            index=models.Index(fields=['genre', 'title'], name='genre_title_genre_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['category', 'year'], name='title_category_year_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='genre_title',
+            constraint=models.UniqueConstraint(fields=('title', 'genre'), name='one_title-one_genre'),
+        ),
+    ]
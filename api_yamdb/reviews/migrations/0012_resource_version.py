@@ -0,0 +1,26 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:08
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0011_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResourceVersion',
+            fields=[
+                ('key', models.CharField(help_text='Ключ ресурса, например title:1:reviews', max_length=100, primary_key=True, serialize=False, verbose_name='Ресурс')),
+                ('version', models.PositiveIntegerField(default=1, help_text='Количество изменений ресурса', verbose_name='Версия')),
+                ('modified', models.DateTimeField(default=django.utils.timezone.now, help_text='Дата последнего изменения ресурса', verbose_name='Дата изменения')),
+            ],
+            options={
+                'verbose_name': 'Версия ресурса',
+                'verbose_name_plural': 'Версии ресурсов',
+            },
+        ),
+    ]
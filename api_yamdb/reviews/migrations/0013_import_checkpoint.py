@@ -0,0 +1,29 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:25
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0012_resource_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportCheckpoint',
+            fields=[
+                ('source', models.CharField(help_text='Путь к загружаемому файлу csv', max_length=255, primary_key=True, serialize=False, verbose_name='Файл')),
+                ('offset', models.BigIntegerField(default=0, help_text='Байт распакованного файла, с которого продолжить загрузку', verbose_name='Смещение')),
+                ('inserted', models.PositiveIntegerField(default=0, help_text='Количество зафиксированных строк', verbose_name='Загружено строк')),
+                ('rejected', models.PositiveIntegerField(default=0, help_text='Количество отклонённых строк', verbose_name='Пропущено строк')),
+                ('last_id', models.BigIntegerField(blank=True, help_text='Наибольший id среди зафиксированных строк', null=True, verbose_name='Последний id')),
+                ('modified', models.DateTimeField(default=django.utils.timezone.now, help_text='Дата последней фиксации', verbose_name='Дата изменения')),
+            ],
+            options={
+                'verbose_name': 'Контрольная точка загрузки',
+                'verbose_name_plural': 'Контрольные точки загрузки',
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0013_import_checkpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RowFingerprint',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('table', models.CharField(help_text='Модель, в которую загружена строка', max_length=50, verbose_name='Таблица')),
+                ('row_id', models.BigIntegerField(help_text='id объекта модели', verbose_name='id строки')),
+                ('digest', models.CharField(help_text='md5 значений строки csv', max_length=32, verbose_name='Хэш')),
+            ],
+            options={
+                'verbose_name': 'Отпечаток строки',
+                'verbose_name_plural': 'Отпечатки строк',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='rowfingerprint',
+            constraint=models.UniqueConstraint(fields=('table', 'row_id'), name='one_table-one_row_fingerprint'),
+        ),
+    ]
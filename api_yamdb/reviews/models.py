@@ -98,11 +98,40 @@ class Title(models.Model):
         verbose_name='Жанр',
         help_text='Жанр'
     )
+    score_sum = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Сумма оценок',
+        help_text='Сумма оценок всех отзывов на произведение',
+    )
+    score_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество оценок',
+        help_text='Количество отзывов на произведение',
+    )
+    rating = models.PositiveSmallIntegerField(
+        null=True,
+        editable=False,
+        verbose_name='Рейтинг',
+        help_text='Средняя оценка произведения',
+    )
 
     class Meta:
         verbose_name = 'Произведение'
         verbose_name_plural = 'Произведения'
         ordering = ('name',)
+        indexes = (
+            models.Index(fields=('name',), name='title_name_idx'),
+            models.Index(
+                fields=('category', 'year'), name='title_category_year_idx'
+            ),
+            models.Index(fields=('year',), name='title_year_idx'),
+            models.Index(fields=('rating',), name='title_rating_idx'),
+            models.Index(
+                fields=('score_count',), name='title_score_count_idx'
+            ),
+        )
         constraints = (
             models.CheckConstraint(
                 check=models.Q(year__gt=date.today().year),
@@ -117,6 +146,73 @@ class Title(models.Model):
         return self.name
 
 
+class TitleRank(models.Model):
+    '''
+    Класс TitleRank: позиция произведения в рейтинге лучших.
+    '''
+    title = models.OneToOneField(
+        Title,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='rank',
+        verbose_name='Произведение',
+        help_text='Произведение',
+    )
+    weighted_rating = models.FloatField(
+        verbose_name='Взвешенный рейтинг',
+        help_text='Средняя оценка, сглаженная к средней по всем отзывам',
+    )
+
+    class Meta:
+        verbose_name = 'Позиция в рейтинге'
+        verbose_name_plural = 'Рейтинг лучших произведений'
+        ordering = ('-weighted_rating', 'title')
+        indexes = (
+            models.Index(
+                fields=('weighted_rating',), name='rank_weighted_rating_idx'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.title}: {self.weighted_rating:.2f}'
+
+
+class ScoreTotal(models.Model):
+    '''
+    Класс ScoreTotal: сумма и количество оценок по всем произведениям.
+
+    Снимок обновляется при перестроении рейтинга лучших, а не при
+    каждой записи отзыва.
+    '''
+    SINGLETON_ID = 1
+    score_sum = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Сумма оценок',
+        help_text='Сумма оценок всех отзывов',
+    )
+    score_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество оценок',
+        help_text='Количество всех отзывов',
+    )
+
+    class Meta:
+        verbose_name = 'Сумма оценок'
+        verbose_name_plural = 'Суммы оценок'
+
+    def __str__(self):
+        return f'Оценок: {self.score_count}, сумма: {self.score_sum}'
+
+    @property
+    def mean(self):
+        '''
+        Средняя оценка по всем отзывам.
+        '''
+        if self.score_count:
+            return self.score_sum / self.score_count
+        return 0
+
+
 class Genre_Title(models.Model):
     '''
     Класс Genre_Title.
@@ -134,6 +230,19 @@ class Genre_Title(models.Model):
         help_text='Произведение',
     )
 
+    class Meta:
+        indexes = (
+            models.Index(
+                fields=('genre', 'title'), name='genre_title_genre_idx'
+            ),
+        )
+        constraints = (
+            models.UniqueConstraint(
+                fields=('title', 'genre'),
+                name='one_title-one_genre'
+            ),
+        )
+
     def __str__(self):
         return f'Жанр {self.genre} для произведения {self.title}'
 
@@ -174,6 +283,12 @@ class Review(models.Model):
         verbose_name = 'Отзыв на произведение'
         verbose_name_plural = 'Отзывы на произведения'
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(
+                fields=('title', '-pub_date', '-id'),
+                name='review_title_pub_date_idx'
+            ),
+        )
         constraints = (
             models.UniqueConstraint(
                 fields=('author', 'title'),
@@ -181,6 +296,20 @@ class Review(models.Model):
             ),
         )
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Запоминаем оценку, загруженную из базы."""
+        instance = super().from_db(db, field_names, values)
+        instance.remember_score()
+        return instance
+
+    def remember_score(self):
+        """Сохраняем произведение и оценку для пересчёта рейтинга."""
+        self._saved_score = (
+            self.__dict__.get('title_id'),
+            self.__dict__.get('score'),
+        )
+
     def __str__(self) -> str:
         """Переопределяем метод для вывода информации об объекте."""
         return (
@@ -189,6 +318,53 @@ class Review(models.Model):
         )
 
 
+class ScoreHistogram(models.Model):
+    '''
+    Класс ScoreHistogram: количество отзывов с каждой оценкой.
+
+    Поля score_1 … score_10 добавляются по Review.SCORES.
+    '''
+    title = models.OneToOneField(
+        Title,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='histogram',
+        verbose_name='Произведение',
+        help_text='Произведение',
+    )
+
+    class Meta:
+        verbose_name = 'Распределение оценок'
+        verbose_name_plural = 'Распределения оценок'
+
+    def __str__(self):
+        return f'Распределение оценок произведения {self.title_id}'
+
+    @staticmethod
+    def field_name(score):
+        return f'score_{score}'
+
+    def as_dict(self):
+        '''
+        Возвращает распределение в виде {оценка: количество отзывов}.
+        '''
+        return {
+            score: getattr(self, self.field_name(score))
+            for score, _ in Review.SCORES
+        }
+
+
+for histogram_score, _ in Review.SCORES:
+    ScoreHistogram.add_to_class(
+        ScoreHistogram.field_name(histogram_score),
+        models.PositiveIntegerField(
+            default=0,
+            verbose_name=f'Оценка {histogram_score}',
+            help_text=f'Количество отзывов с оценкой {histogram_score}',
+        )
+    )
+
+
 class Comment(models.Model):
     """Модель комментария к отзыву на произведение."""
     text = models.TextField(
@@ -219,6 +395,12 @@ class Comment(models.Model):
         verbose_name = 'Комментарий к отзыву'
         verbose_name_plural = 'Комментарии к отзывам'
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(
+                fields=('review', '-pub_date', '-id'),
+                name='comment_review_pub_date_idx'
+            ),
+        )
 
     def __str__(self) -> str:
         """Переопределяем метод для вывода информации об объекте."""
@@ -226,3 +408,104 @@ class Comment(models.Model):
             'Комментарий пользователя '
             f'{self.author} к отзыву с ID = {self.review.id}'
         )
+
+
+class ResourceVersion(models.Model):
+    """Счётчик изменений ресурса API для условных GET-запросов."""
+    key = models.CharField(
+        max_length=100,
+        primary_key=True,
+        verbose_name='Ресурс',
+        help_text='Ключ ресурса, например title:1:reviews',
+    )
+    version = models.PositiveIntegerField(
+        default=1,
+        verbose_name='Версия',
+        help_text='Количество изменений ресурса',
+    )
+    modified = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Дата изменения',
+        help_text='Дата последнего изменения ресурса',
+    )
+
+    class Meta:
+        verbose_name = 'Версия ресурса'
+        verbose_name_plural = 'Версии ресурсов'
+
+    def __str__(self) -> str:
+        return f'{self.key}: {self.version}'
+
+
+class ImportCheckpoint(models.Model):
+    """Место в файле csv, до которого data_from_csv зафиксировала данные."""
+    source = models.CharField(
+        max_length=255,
+        primary_key=True,
+        verbose_name='Файл',
+        help_text='Путь к загружаемому файлу csv',
+    )
+    offset = models.BigIntegerField(
+        default=0,
+        verbose_name='Смещение',
+        help_text='Байт распакованного файла, с которого продолжить загрузку',
+    )
+    inserted = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Загружено строк',
+        help_text='Количество зафиксированных строк',
+    )
+    rejected = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Пропущено строк',
+        help_text='Количество отклонённых строк',
+    )
+    last_id = models.BigIntegerField(
+        null=True,
+        blank=True,
+        verbose_name='Последний id',
+        help_text='Наибольший id среди зафиксированных строк',
+    )
+    modified = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Дата изменения',
+        help_text='Дата последней фиксации',
+    )
+
+    class Meta:
+        verbose_name = 'Контрольная точка загрузки'
+        verbose_name_plural = 'Контрольные точки загрузки'
+
+    def __str__(self) -> str:
+        return f'{self.source}: {self.offset}'
+
+
+class RowFingerprint(models.Model):
+    """Хэш строки csv, загруженной командой data_from_csv --upsert."""
+    table = models.CharField(
+        max_length=50,
+        verbose_name='Таблица',
+        help_text='Модель, в которую загружена строка',
+    )
+    row_id = models.BigIntegerField(
+        verbose_name='id строки',
+        help_text='id объекта модели',
+    )
+    digest = models.CharField(
+        max_length=32,
+        verbose_name='Хэш',
+        help_text='md5 значений строки csv',
+    )
+
+    class Meta:
+        verbose_name = 'Отпечаток строки'
+        verbose_name_plural = 'Отпечатки строк'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('table', 'row_id'),
+                name='one_table-one_row_fingerprint'
+            ),
+        )
+
+    def __str__(self) -> str:
+        return f'{self.table}:{self.row_id}'
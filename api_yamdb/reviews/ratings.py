@@ -0,0 +1,207 @@
+from django.conf import settings
+from django.db.models import (
+    Case, Count, ExpressionWrapper, F, IntegerField, OuterRef, Q, Subquery,
+    Sum, When
+)
+from django.db.models.functions import Coalesce
+
+from reviews.models import (
+    Review, ScoreHistogram, ScoreTotal, Title, TitleRank
+)
+
+BATCH_SIZE = 1000
+
+
+def rating_expression(score_sum, score_count, has_scores):
+    '''
+    Выражение для средней оценки, пустой при отсутствии оценок.
+    '''
+    return Case(
+        When(
+            has_scores,
+            then=ExpressionWrapper(
+                score_sum / score_count,
+                output_field=IntegerField()
+            ),
+        ),
+        default=None,
+        output_field=IntegerField(),
+    )
+
+
+def change_title_score(title_id, score_delta, count_delta):
+    '''
+    Атомарно изменяет сумму, количество оценок и рейтинг произведения
+    и его позицию в рейтинге лучших.
+
+    Общая сумма оценок здесь не меняется: одна строка на все отзывы
+    выстроила бы все записи отзывов в очередь за её блокировкой.
+    Средняя оценка для рейтинга лучших берётся из снимка, который
+    обновляет rebuild_leaderboard.
+    '''
+    score_sum = F('score_sum') + score_delta
+    score_count = F('score_count') + count_delta
+    Title.objects.filter(pk=title_id).update(
+        score_sum=score_sum,
+        score_count=score_count,
+        rating=rating_expression(
+            score_sum, score_count, Q(score_count__gt=-count_delta)
+        ),
+    )
+    rank_title(title_id, create=count_delta >= 0)
+
+
+def weighted_rating(score_sum, score_count, mean):
+    '''
+    Байесовская оценка: средняя оценка произведения, сглаженная
+    к средней по всем отзывам с весом LEADERBOARD_PRIOR_WEIGHT.
+    '''
+    weight = settings.LEADERBOARD_PRIOR_WEIGHT
+    return (score_sum + weight * mean) / (score_count + weight)
+
+
+def get_score_mean():
+    '''
+    Средняя оценка по всем отзывам на момент последнего
+    перестроения рейтинга лучших.
+    '''
+    total = ScoreTotal.objects.filter(pk=ScoreTotal.SINGLETON_ID).first()
+    if total is None:
+        total = recount_score_total()
+    return total.mean
+
+
+def recount_score_total():
+    '''
+    Пересчитывает общую сумму и количество оценок по произведениям.
+    '''
+    totals = Title.objects.aggregate(
+        score_sum=Coalesce(Sum('score_sum'), 0),
+        score_count=Coalesce(Sum('score_count'), 0),
+    )
+    total, _ = ScoreTotal.objects.update_or_create(
+        pk=ScoreTotal.SINGLETON_ID, defaults=totals
+    )
+    return total
+
+
+def rank_title(title_id, create=True):
+    '''
+    Обновляет позицию произведения в рейтинге лучших.
+
+    Произведения без отзывов в рейтинг не попадают. Позиция создаётся
+    только при добавлении оценки, чтобы каскадное удаление произведения
+    не оставляло записей в рейтинге.
+    '''
+    scores = Title.objects.filter(pk=title_id).values_list(
+        'score_sum', 'score_count'
+    ).first()
+    if scores is None or not scores[1]:
+        TitleRank.objects.filter(title_id=title_id).delete()
+        return
+    value = weighted_rating(*scores, get_score_mean())
+    updated = TitleRank.objects.filter(title_id=title_id).update(
+        weighted_rating=value
+    )
+    if not updated and create:
+        TitleRank.objects.create(title_id=title_id, weighted_rating=value)
+
+
+def rebuild_leaderboard():
+    '''
+    Полностью перестраивает рейтинг лучших с текущей средней оценкой.
+
+    Между перестроениями позиции считаются по прежней средней, поэтому
+    команду rebuild_leaderboard нужно запускать по расписанию.
+    '''
+    mean = recount_score_total().mean
+    TitleRank.objects.all().delete()
+    scores = Title.objects.filter(score_count__gt=0).order_by().values_list(
+        'pk', 'score_sum', 'score_count'
+    )
+    batch = []
+    for title_id, score_sum, score_count in scores.iterator(
+        chunk_size=BATCH_SIZE
+    ):
+        batch.append(TitleRank(
+            title_id=title_id,
+            weighted_rating=weighted_rating(score_sum, score_count, mean),
+        ))
+        if len(batch) >= BATCH_SIZE:
+            TitleRank.objects.bulk_create(batch)
+            batch = []
+    TitleRank.objects.bulk_create(batch)
+
+
+def recount_title_scores(titles=None):
+    '''
+    Пересчитывает сумму, количество оценок и рейтинг по таблице отзывов.
+    '''
+    if titles is None:
+        titles = Title.objects.all()
+    reviews = Review.objects.filter(
+        title=OuterRef('pk')
+    ).order_by().values('title')
+    updated = titles.update(
+        score_sum=Coalesce(
+            Subquery(
+                reviews.annotate(total=Sum('score')).values('total'),
+                output_field=IntegerField(),
+            ),
+            0,
+        ),
+        score_count=Coalesce(
+            Subquery(
+                reviews.annotate(total=Count('pk')).values('total'),
+                output_field=IntegerField(),
+            ),
+            0,
+        ),
+    )
+    titles.update(
+        rating=rating_expression(
+            F('score_sum'), F('score_count'), Q(score_count__gt=0)
+        )
+    )
+    return updated
+
+
+def change_score_histogram(title_id, score, delta):
+    '''
+    Атомарно изменяет количество отзывов с оценкой score у произведения.
+    '''
+    field = ScoreHistogram.field_name(score)
+    updated = ScoreHistogram.objects.filter(title_id=title_id).update(
+        **{field: F(field) + delta}
+    )
+    if not updated and delta > 0:
+        ScoreHistogram.objects.create(title_id=title_id, **{field: delta})
+
+
+def recount_score_histograms(titles=None):
+    '''
+    Пересчитывает распределения оценок по таблице отзывов.
+    '''
+    histograms = ScoreHistogram.objects.all()
+    reviews = Review.objects.all()
+    if titles is not None:
+        histograms = histograms.filter(title__in=titles)
+        reviews = reviews.filter(title__in=titles)
+    histograms.delete()
+    counts = reviews.order_by('title').values('title', 'score').annotate(
+        total=Count('pk')
+    )
+    batch = {}
+    for row in counts.iterator(chunk_size=BATCH_SIZE):
+        histogram = batch.get(row['title'])
+        if histogram is None:
+            if len(batch) >= BATCH_SIZE:
+                ScoreHistogram.objects.bulk_create(batch.values())
+                batch = {}
+            histogram = batch[row['title']] = ScoreHistogram(
+                title_id=row['title']
+            )
+        setattr(
+            histogram, ScoreHistogram.field_name(row['score']), row['total']
+        )
+    ScoreHistogram.objects.bulk_create(batch.values())
@@ -0,0 +1,180 @@
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+WORD_RE = re.compile(r'\w+')
+MIN_STEM_LENGTH = 3
+# окончания русских слов, от длинных к коротким
+RUSSIAN_ENDINGS = (
+    'иями', 'ями', 'ами', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими', 'ией',
+    'ой', 'ей', 'ий', 'ый', 'ая', 'яя', 'ое', 'ее', 'ые', 'ие', 'ов', 'ев',
+    'ам', 'ям', 'ах', 'ях', 'ом', 'ем', 'ую', 'юю', 'ию',
+    'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь', 'й',
+)
+
+
+def is_search_available(conn=connection):
+    '''
+    Полнотекстовый индекс FTS5 поддерживается только для SQLite.
+    '''
+    return conn.vendor == 'sqlite'
+
+
+def stem(word):
+    '''
+    Отбрасывает окончание слова, оставляя основу для поиска по префиксу.
+    '''
+    for ending in RUSSIAN_ENDINGS:
+        if (
+            word.endswith(ending)
+            and len(word) - len(ending) >= MIN_STEM_LENGTH
+        ):
+            return word[:-len(ending)]
+    return word
+
+
+def build_match_query(text):
+    '''
+    Строит запрос FTS5: все основы слов должны встретиться как префиксы.
+    '''
+    words = WORD_RE.findall(text.lower())
+    return ' '.join(f'"{stem(word)}"*' for word in words)
+
+
+class SearchMatches(RawSQL):
+    '''
+    Подзапрос rowid записей индекса, подходящих под запрос FTS5.
+
+    Скобки добавляет сам фильтр __in: SQLite читает «IN ((SELECT …))»
+    как список из одного значения.
+    '''
+    def __init__(self, table, match):
+        super().__init__(
+            f'SELECT rowid FROM {table} WHERE {table} MATCH %s', (match,)
+        )
+
+    def as_sql(self, compiler, connection):
+        return self.sql, self.params
+
+
+class SearchIndex:
+    '''
+    Полнотекстовый индекс FTS5 по текстовым полям таблицы модели.
+
+    Строка индекса имеет rowid, равный id записи, поэтому индекс
+    соединяется с таблицей модели по rowid.
+    '''
+    def __init__(self, table, source_table, columns, rank=None):
+        self.table = table
+        self.source_table = source_table
+        self.columns = columns
+        self.rank = rank
+
+    def create(self, conn=connection):
+        with conn.cursor() as cursor:
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} '
+                f'USING fts5({", ".join(self.columns)}, '
+                "tokenize='unicode61 remove_diacritics 2')"
+            )
+            if self.rank:
+                cursor.execute(
+                    f'INSERT INTO {self.table}({self.table}, rank) '
+                    'VALUES (%s, %s)',
+                    ('rank', self.rank)
+                )
+
+    def drop(self, conn=connection):
+        with conn.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {self.table}')
+
+    def rebuild(self, conn=connection):
+        '''
+        Заполняет индекс заново по таблице модели.
+        '''
+        if not is_search_available(conn):
+            return
+        columns = ', '.join(self.columns)
+        values = ', '.join(
+            f"COALESCE({column}, '')" for column in self.columns
+        )
+        with conn.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+            cursor.execute(
+                f'INSERT INTO {self.table}(rowid, {columns}) '
+                f'SELECT id, {values} FROM {self.source_table}'
+            )
+
+    def add(self, obj):
+        if not is_search_available():
+            return
+        values = [getattr(obj, column) or '' for column in self.columns]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {self.table} WHERE rowid = %s', (obj.pk,)
+            )
+            cursor.execute(
+                f'INSERT INTO {self.table}(rowid, {", ".join(self.columns)}) '
+                f'VALUES (%s{", %s" * len(self.columns)})',
+                (obj.pk, *values)
+            )
+
+    def remove(self, pk):
+        if not is_search_available():
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {self.table} WHERE rowid = %s', (pk,)
+            )
+
+    def search(self, queryset, text):
+        '''
+        Отбирает записи по словам из text, от наиболее релевантных.
+
+        Индекс присоединяется к таблице модели по rowid, поэтому запрос
+        FTS5 выполняется один раз, а ранг bm25 (меньше - релевантнее)
+        читается из той же строки индекса.
+        Без поддержки FTS5 ищет вхождение текста в индексируемые поля.
+        '''
+        match = build_match_query(text)
+        if not match or not is_search_available():
+            return self.filter(queryset, text)
+        source = queryset.model._meta.db_table
+        return queryset.extra(
+            select={'search_rank': f'{self.table}.rank'},
+            tables=(self.table,),
+            where=(
+                f'{self.table}.rowid = {source}.id',
+                f'{self.table} MATCH %s',
+            ),
+            params=(match,),
+        ).order_by('search_rank', 'pk')
+
+    def filter(self, queryset, text):
+        '''
+        Отбирает записи по словам из text без ранга, например для
+        подсчётов, где порядок не важен.
+        '''
+        match = build_match_query(text)
+        if not match:
+            return queryset.none()
+        if not is_search_available():
+            condition = Q()
+            for column in self.columns:
+                condition |= Q(**{f'{column}__icontains': text})
+            return queryset.filter(condition)
+        return queryset.filter(pk__in=SearchMatches(self.table, match))
+
+
+# совпадение в названии произведения весит больше, чем в описании
+TITLE_INDEX = SearchIndex(
+    'reviews_title_fts', 'reviews_title', ('name', 'description'),
+    rank='bm25(10.0, 1.0)'
+)
+REVIEW_INDEX = SearchIndex('reviews_review_fts', 'reviews_review', ('text',))
+COMMENT_INDEX = SearchIndex(
+    'reviews_comment_fts', 'reviews_comment', ('text',)
+)
+SEARCH_INDEXES = (TITLE_INDEX, REVIEW_INDEX, COMMENT_INDEX)
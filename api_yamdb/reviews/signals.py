@@ -0,0 +1,175 @@
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_save
+)
+from django.dispatch import receiver
+
+from reviews import versions
+from reviews.models import (
+    Category, Comment, Genre, Genre_Title, Review, Title, User
+)
+from reviews.ratings import (
+    change_score_histogram, change_title_score, rank_title,
+    recount_score_histograms, recount_title_scores
+)
+from reviews.search import COMMENT_INDEX, REVIEW_INDEX, TITLE_INDEX
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, created, **kwargs):
+    '''
+    Учитывает оценку нового или изменённого отзыва в рейтинге
+    и распределении оценок.
+    '''
+    score = int(instance.score)
+    if created:
+        change_title_score(instance.title_id, score, 1)
+        change_score_histogram(instance.title_id, score, 1)
+    else:
+        old_title_id, old_score = getattr(
+            instance, '_saved_score', (None, None)
+        )
+        if old_title_id is None or old_score is None:
+            titles = Title.objects.filter(pk=instance.title_id)
+            recount_title_scores(titles)
+            recount_score_histograms(titles)
+            rank_title(instance.title_id)
+        elif old_title_id != instance.title_id:
+            change_title_score(old_title_id, -old_score, -1)
+            change_title_score(instance.title_id, score, 1)
+            change_score_histogram(old_title_id, old_score, -1)
+            change_score_histogram(instance.title_id, score, 1)
+        elif old_score != score:
+            change_title_score(instance.title_id, score - old_score, 0)
+            change_score_histogram(instance.title_id, old_score, -1)
+            change_score_histogram(instance.title_id, score, 1)
+    instance.score = score
+    instance.remember_score()
+    REVIEW_INDEX.add(instance)
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    '''
+    Исключает оценку удалённого отзыва из рейтинга
+    и распределения оценок.
+    '''
+    score = int(instance.score)
+    change_title_score(instance.title_id, -score, -1)
+    change_score_histogram(instance.title_id, score, -1)
+    REVIEW_INDEX.remove(instance.pk)
+
+
+@receiver(post_save, sender=Title)
+def title_saved(sender, instance, **kwargs):
+    '''
+    Обновляет произведение в полнотекстовом индексе.
+    '''
+    TITLE_INDEX.add(instance)
+
+
+@receiver(post_delete, sender=Title)
+def title_deleted(sender, instance, **kwargs):
+    '''
+    Удаляет произведение из полнотекстового индекса.
+    '''
+    TITLE_INDEX.remove(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, **kwargs):
+    '''
+    Обновляет комментарий в полнотекстовом индексе.
+    '''
+    COMMENT_INDEX.add(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    '''
+    Удаляет комментарий из полнотекстового индекса.
+    '''
+    COMMENT_INDEX.remove(instance.pk)
+
+
+@receiver((post_save, post_delete), sender=Title)
+def title_changed(sender, instance, **kwargs):
+    '''
+    Отмечает изменение произведения и списка произведений.
+    '''
+    versions.bump(versions.TITLES, versions.title_key(instance.pk))
+
+
+@receiver((post_save, post_delete), sender=Genre_Title)
+def title_genre_changed(sender, instance, **kwargs):
+    versions.bump(versions.TITLES, versions.title_key(instance.title_id))
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def title_genres_changed(sender, instance, action, reverse, pk_set,
+                         **kwargs):
+    '''
+    Отмечает изменение жанров произведения через Title.genre.
+    '''
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        title_ids = (instance.pk,)
+    else:
+        title_ids = pk_set or ()
+    versions.bump(
+        versions.TITLES, *(versions.title_key(pk) for pk in title_ids)
+    )
+
+
+@receiver((post_save, post_delete), sender=Category)
+def category_changed(sender, instance, **kwargs):
+    versions.bump(versions.CATEGORIES, versions.TITLES)
+
+
+@receiver((post_save, post_delete), sender=Genre)
+def genre_changed(sender, instance, **kwargs):
+    versions.bump(versions.GENRES, versions.TITLES)
+
+
+@receiver((post_save, post_delete), sender=Review)
+def review_changed(sender, instance, **kwargs):
+    '''
+    Отмечает изменение отзывов и рейтинга произведения.
+    '''
+    versions.bump(
+        versions.TITLES,
+        versions.title_key(instance.title_id),
+        versions.title_reviews_key(instance.title_id),
+    )
+
+
+@receiver((post_save, post_delete), sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    versions.bump(versions.review_comments_key(instance.review_id))
+
+
+@receiver(pre_save, sender=User)
+def user_saving(sender, instance, update_fields, **kwargs):
+    '''
+    Запоминает, меняется ли имя пользователя. Из полей пользователя
+    в отзывах и комментариях выводится только имя, а у нового
+    пользователя ещё нет ни отзывов, ни комментариев.
+    '''
+    instance._username_changed = (
+        instance.pk is not None
+        and (update_fields is None or 'username' in update_fields)
+        and User.objects.filter(pk=instance.pk).exclude(
+            username=instance.username
+        ).exists()
+    )
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, **kwargs):
+    if getattr(instance, '_username_changed', False):
+        versions.bump(versions.USERS)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    versions.bump(versions.USERS)
@@ -0,0 +1,121 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from django.db.models import CharField, Exists, F, OuterRef, Q, Value
+from django.db.models.functions import Cast, Concat
+from django.utils import timezone
+
+from reviews.models import ResourceVersion
+
+TITLES = 'titles'
+CATEGORIES = 'categories'
+GENRES = 'genres'
+USERS = 'users'
+
+
+def get_cache():
+    return caches[settings.API_CACHE_ALIAS]
+
+
+def cache_key(key):
+    return f'version:{key}'
+
+
+def forget(keys):
+    '''
+    Удаляет версии из кэша сразу и после фиксации транзакции,
+    чтобы параллельный запрос не закэшировал старое значение.
+    '''
+    cache_keys = [cache_key(key) for key in keys]
+    get_cache().delete_many(cache_keys)
+    transaction.on_commit(lambda: get_cache().delete_many(cache_keys))
+
+
+def title_key(title_id):
+    return f'title:{title_id}'
+
+
+def filter_titles_changed_since(titles, since):
+    '''
+    Произведения, счётчик изменений которых увеличивался не раньше since.
+
+    У произведений, загруженных без сигналов, счётчика может не быть;
+    время их изменения неизвестно, поэтому они тоже попадают в выборку.
+    '''
+    title_versions = ResourceVersion.objects.filter(
+        key=Concat(Value(title_key('')), Cast(OuterRef('pk'), CharField()))
+    )
+    return titles.annotate(
+        changed_since=Exists(title_versions.filter(modified__gte=since)),
+        versioned=Exists(title_versions),
+    ).filter(Q(changed_since=True) | Q(versioned=False))
+
+
+def title_reviews_key(title_id):
+    return f'title:{title_id}:reviews'
+
+
+def review_comments_key(review_id):
+    return f'review:{review_id}:comments'
+
+
+def bump(*keys):
+    '''
+    Увеличивает счётчики изменений ресурсов, создавая недостающие.
+    '''
+    keys = set(keys)
+    now = timezone.now()
+    forget(keys)
+    updated = ResourceVersion.objects.filter(key__in=keys).update(
+        version=F('version') + 1, modified=now
+    )
+    if updated == len(keys):
+        return
+    existing = set(ResourceVersion.objects.filter(
+        key__in=keys
+    ).values_list('key', flat=True))
+    for key in keys - existing:
+        try:
+            with transaction.atomic():
+                ResourceVersion.objects.create(key=key, modified=now)
+        except IntegrityError:
+            ResourceVersion.objects.filter(key=key).update(
+                version=F('version') + 1, modified=now
+            )
+
+
+def get_versions(keys):
+    '''
+    Возвращает версии ресурсов и дату последнего изменения любого из них.
+
+    Версии читаются из кэша API, в базу идёт запрос только за недостающими.
+    Сбрасывает их только bump(), поэтому кэш API должен быть общим для
+    всех процессов: с LocMemCache запись в одном процессе не сбросит
+    версии в остальных, и они будут отдавать старые ответы.
+    '''
+    cache = get_cache()
+    cached = cache.get_many([cache_key(key) for key in keys])
+    stamps = {
+        key: cached[cache_key(key)]
+        for key in keys if cache_key(key) in cached
+    }
+    missing = [key for key in keys if key not in stamps]
+    if missing:
+        loaded = dict.fromkeys(missing, (0, None))
+        loaded.update(
+            (key, (version, changed))
+            for key, version, changed in ResourceVersion.objects.filter(
+                key__in=missing
+            ).values_list('key', 'version', 'modified')
+        )
+        cache.set_many(
+            {cache_key(key): stamp for key, stamp in loaded.items()},
+            settings.API_CACHE_TIMEOUT
+        )
+        stamps.update(loaded)
+    versions = {key: version for key, (version, _) in stamps.items()}
+    modified = max(
+        (changed for _, changed in stamps.values() if changed),
+        default=None
+    )
+    return versions, modified
@@ -0,0 +1,182 @@
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.db.models import QuerySet
+
+from .common import create_reviews
+
+
+class Test08RatingAPI:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_rating_follows_review_changes(self, admin_client, admin):
+        reviews, titles, _, _ = create_reviews(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        assert admin_client.get(url).json().get('rating') == 4, (
+            'Проверьте, что `rating` считается по сохранённым оценкам'
+        )
+        admin_client.patch(
+            f'{url}reviews/{reviews[0]["id"]}/', data={'score': 8}
+        )
+        assert admin_client.get(url).json().get('rating') == 5, (
+            'Проверьте, что при изменении оценки отзыва `rating` пересчитывается'
+        )
+        admin_client.delete(f'{url}reviews/{reviews[1]["id"]}/')
+        assert admin_client.get(url).json().get('rating') == 6, (
+            'Проверьте, что при удалении отзыва `rating` пересчитывается'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_recount_ratings_command(self, admin_client, admin):
+        from reviews.models import Title
+        _, titles, _, _ = create_reviews(admin_client, admin)
+        Title.objects.update(score_sum=0, score_count=0)
+        call_command('recount_ratings')
+        title = Title.objects.get(pk=titles[0]['id'])
+        assert (title.score_sum, title.score_count) == (12, 3), (
+            'Проверьте, что команда `recount_ratings` '
+            'восстанавливает сумму и количество оценок'
+        )
+        assert Title.objects.get(pk=titles[1]['id']).rating is None
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_titles_ordering(self, client, admin_client, admin):
+        _, titles, _, _ = create_reviews(admin_client, admin)
+        for ordering, first in (
+            ('-rating', titles[0]),
+            ('-reviews_count', titles[0]),
+            ('reviews_count', titles[1]),
+            ('-year', titles[1]),
+            ('year', titles[0]),
+            ('-name', titles[1]),
+        ):
+            response = client.get(f'/api/v1/titles/?ordering={ordering}')
+            assert response.status_code == 200
+            assert response.json()['results'][0]['id'] == first['id'], (
+                'Проверьте, что GET запрос `/api/v1/titles/` '
+                f'поддерживает сортировку `ordering={ordering}`'
+            )
+        for ordering in ('-rating', '-reviews_count', '-year', 'year'):
+            with CaptureQueriesContext(connection) as context:
+                client.get(f'/api/v1/titles/?ordering={ordering}')
+            sql = next(
+                query['sql'] for query in context.captured_queries
+                if 'ORDER BY' in query['sql']
+            )
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                plan = ' '.join(str(row) for row in cursor.fetchall())
+            assert 'TEMP B-TREE' not in plan, (
+                f'Проверьте, что сортировка `ordering={ordering}` читает '
+                f'индекс без дополнительной сортировки: {plan}'
+            )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_top_titles(self, client, admin_client, admin):
+        _, titles, _, _ = create_reviews(admin_client, admin)
+        url = f'/api/v1/titles/{titles[1]["id"]}/reviews/'
+        with CaptureQueriesContext(connection) as context:
+            admin_client.post(url, data={'text': 'Шедевр', 'score': 10})
+        assert not any(
+            'reviews_scoretotal' in query['sql']
+            and not query['sql'].startswith('SELECT')
+            for query in context.captured_queries
+        ), (
+            'Проверьте, что запись отзыва не меняет общую сумму оценок: '
+            'её обновляет команда rebuild_leaderboard'
+        )
+        call_command('rebuild_leaderboard')
+        response = client.get('/api/v1/titles/top/')
+        assert response.status_code == 200, (
+            'Проверьте, что GET запрос `/api/v1/titles/top/` возвращает статус 200'
+        )
+        data = response.json()
+        assert [title['id'] for title in data] == [
+            titles[1]['id'], titles[0]['id']
+        ], (
+            'Проверьте, что `/api/v1/titles/top/` сортирует произведения '
+            'по взвешенному рейтингу'
+        )
+        assert data[0]['weighted_rating'] == pytest.approx(
+            (10 + 10 * 22 / 4) / 11
+        )
+        response = client.get(
+            f'/api/v1/titles/top/?n=1&genre={titles[0]["genre"][0]}'
+        )
+        assert [title['id'] for title in response.json()] == [titles[0]['id']]
+        assert client.get('/api/v1/titles/top/?n=0').status_code == 400
+        admin_client.delete(f'{url}{admin_client.get(url).json()["results"][0]["id"]}/')
+        response = client.get('/api/v1/titles/top/')
+        assert [title['id'] for title in response.json()] == [titles[0]['id']], (
+            'Проверьте, что произведения без отзывов не попадают в рейтинг'
+        )
+        admin_client.delete(f'/api/v1/titles/{titles[0]["id"]}/')
+        assert client.get('/api/v1/titles/top/').json() == []
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_score_histogram(self, client, admin_client, admin):
+        reviews, titles, _, _ = create_reviews(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        admin_client.patch(
+            f'{url}reviews/{reviews[1]["id"]}/', data={'score': 5}
+        )
+        response = client.get(f'{url}histogram/')
+        assert response.status_code == 200, (
+            'Проверьте, что GET запрос `/api/v1/titles/{title_id}/histogram/` '
+            'возвращает статус 200'
+        )
+        expected = {str(score): 0 for score in range(1, 11)}
+        expected.update({'4': 1, '5': 2})
+        assert response.json() == expected, (
+            'Проверьте, что распределение оценок обновляется при изменении отзыва'
+        )
+        assert 'histogram' not in client.get(url).json()
+        assert client.get(f'{url}?histogram=1').json()['histogram'] == expected
+        response = client.get('/api/v1/titles/?histogram=true')
+        histograms = {
+            title['id']: title['histogram']
+            for title in response.json()['results']
+        }
+        assert histograms[titles[1]['id']] == {
+            str(score): 0 for score in range(1, 11)
+        }
+        assert client.get('/api/v1/titles/999/histogram/').status_code == 404
+
+    @pytest.mark.django_db(transaction=True)
+    def test_06_review_locked_for_update(self, admin_client, admin,
+                                         monkeypatch):
+        reviews, titles, _, _ = create_reviews(admin_client, admin)
+        locks = []
+        select_for_update = QuerySet.select_for_update
+
+        def spy(queryset, *args, **kwargs):
+            locks.append((queryset.model.__name__, connection.in_atomic_block))
+            return select_for_update(queryset, *args, **kwargs)
+        monkeypatch.setattr(QuerySet, 'select_for_update', spy)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/'
+        admin_client.patch(url, data={'score': 8})
+        admin_client.delete(url)
+        assert locks == [('Review', True), ('Review', True)], (
+            'Проверьте, что изменяемый и удаляемый отзыв блокируется '
+            'в той же транзакции, в которой пересчитывается рейтинг'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_07_recount_ratings_resets_cache(self, client, admin_client,
+                                             admin):
+        from reviews.models import Review
+        _, titles, _, _ = create_reviews(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        assert client.get(url).json()['rating'] == 4
+        etag = client.get('/api/v1/titles/')['ETag']
+        Review.objects.filter(title_id=titles[0]['id']).update(score=2)
+        call_command('recount_ratings')
+        assert client.get(url).json()['rating'] == 2, (
+            'Проверьте, что команда `recount_ratings` сбрасывает '
+            'кэш изменённых произведений'
+        )
+        response = client.get('/api/v1/titles/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что после `recount_ratings` меняется ETag списка'
+        )
@@ -0,0 +1,106 @@
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .common import create_comments, create_reviews, create_titles
+
+
+def count_queries(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(context.captured_queries)
+
+
+class Test09QueriesAPI:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_titles_constant_queries(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        few = count_queries(client, '/api/v1/titles/')
+        for number in range(5):
+            admin_client.post('/api/v1/titles/', data={
+                'name': f'Произведение {number}',
+                'year': 2001,
+                'genre': titles[0]['genre'],
+                'category': titles[0]['category'],
+            })
+        assert count_queries(client, '/api/v1/titles/') == few, (
+            'Проверьте, что число запросов к БД при GET запросе '
+            '`/api/v1/titles/` не зависит от количества произведений'
+        )
+        assert count_queries(
+            client, f'/api/v1/titles/{titles[0]["id"]}/'
+        ) <= 3
+
+    @pytest.mark.django_db
+    def test_02_index_audit_has_no_full_scans(self):
+        call_command('index_audit', '--strict')
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_duplicate_review_rejected_by_constraint(self, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        data = {'text': 'Отзыв', 'score': 5}
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.post(url, data=data)
+        assert response.status_code == 201
+        title_lookups = [
+            query for query in context.captured_queries
+            if query['sql'].startswith('SELECT "reviews_title"."id"')
+        ]
+        assert len(title_lookups) == 1, (
+            'Проверьте, что при POST запросе отзыва произведение '
+            'загружается из БД один раз'
+        )
+        response = admin_client.post(url, data=data)
+        assert response.status_code == 400, (
+            'Проверьте, что повторный отзыв автора возвращает статус 400'
+        )
+        assert response.json() == {
+            'non_field_errors': ['Нельзя добавлять более одного отзыва!']
+        }
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_comments_check_review_title(self, admin_client, admin):
+        reviews, titles, _, _ = create_reviews(admin_client, admin)
+        review_id = reviews[0]['id']
+        url = f'/api/v1/titles/{titles[1]["id"]}/reviews/{review_id}/comments/'
+        response = admin_client.get(url)
+        assert response.status_code == 404, (
+            'Проверьте, что при GET запросе `/api/v1/titles/{title_id}/'
+            'reviews/{review_id}/comments/` с отзывом другого произведения '
+            'возвращается статус 404'
+        )
+        response = admin_client.post(url, data={'text': 'Комментарий'})
+        assert response.status_code == 404, (
+            'Проверьте, что нельзя добавить комментарий через адрес '
+            'с отзывом другого произведения'
+        )
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/{review_id}/comments/'
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.post(url, data={'text': 'Комментарий'})
+        assert response.status_code == 201
+        review_lookups = [
+            query for query in context.captured_queries
+            if query['sql'].startswith('SELECT "reviews_review"."id"')
+        ]
+        assert len(review_lookups) == 1, (
+            'Проверьте, что при POST запросе комментария отзыв '
+            'загружается из БД одним запросом'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_reviews_and_comments_constant_queries(self, client, admin_client, admin):
+        comments, reviews, titles, _, _ = create_comments(admin_client, admin)
+        reviews_url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        comments_url = f'{reviews_url}{reviews[0]["id"]}/comments/'
+        for url in (reviews_url, comments_url):
+            count_queries(client, url)
+            one = count_queries(client, f'{url}?limit=1')
+            many = count_queries(client, f'{url}?limit=3')
+            assert one == many, (
+                f'Проверьте, что число запросов к БД при GET запросе `{url}` '
+                'не зависит от размера страницы'
+            )
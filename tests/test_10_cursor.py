@@ -0,0 +1,98 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .common import create_reviews
+
+
+class Test10CursorPaginationAPI:
+
+    def walk(self, client, url, key):
+        ids = []
+        pages = []
+        while url:
+            response = client.get(url)
+            assert response.status_code == 200, (
+                f'Проверьте, что GET запрос `{url}` возвращает статус 200'
+            )
+            data = response.json()
+            assert 'count' not in data
+            pages.append(data)
+            page_ids = [item['id'] for item in data['results']]
+            ids = page_ids + ids if key == 'previous' else ids + page_ids
+            url = data[key]
+        return ids, pages
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_comments_cursor(self, client, admin_client, admin):
+        from reviews.models import Comment, Review
+        reviews, titles, _, _ = create_reviews(admin_client, admin)
+        review = Review.objects.get(pk=reviews[0]['id'])
+        pub_date = timezone.now()
+        Comment.objects.bulk_create(
+            Comment(review=review, author=admin, text=str(number),
+                    pub_date=pub_date)
+            for number in range(23)
+        )
+        expected = list(
+            Comment.objects.order_by('-pub_date', '-pk').values_list(
+                'pk', flat=True
+            )
+        )
+        url = (
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/{review.pk}/comments/'
+        )
+        ids, pages = self.walk(client, f'{url}?cursor=', 'next')
+        assert ids == expected, (
+            'Проверьте, что при GET запросе с параметром `cursor` '
+            'комментарии выдаются по порядку (pub_date, id) без пропусков'
+        )
+        assert [len(page['results']) for page in pages] == [10, 10, 3]
+        assert pages[0]['previous'] is None
+        back_ids, _ = self.walk(client, pages[-1]['previous'], 'previous')
+        assert back_ids == expected[:20]
+        assert client.get(f'{url}?cursor=broken').status_code == 404
+        assert 'count' in client.get(url).json(), (
+            'Проверьте, что без параметра `cursor` пагинация не изменилась'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_reviews_cursor(self, client, admin_client, admin):
+        reviews, titles, _, _ = create_reviews(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/?cursor='
+        ids, _ = self.walk(client, url, 'next')
+        assert ids == [review['id'] for review in reversed(reviews)]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_cursor_uses_index_range(self, client, admin_client, admin):
+        from reviews.models import Comment, Review
+        reviews, titles, _, _ = create_reviews(admin_client, admin)
+        review = Review.objects.get(pk=reviews[0]['id'])
+        Comment.objects.bulk_create(
+            Comment(review=review, author=admin, text=str(number))
+            for number in range(23)
+        )
+        url = (
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/{review.pk}/comments/'
+        )
+        forward = client.get(f'{url}?cursor=').json()['next']
+        backward = client.get(forward).json()['previous']
+        for url, bound in ((forward, '<='), (backward, '>=')):
+            with CaptureQueriesContext(connection) as context:
+                assert client.get(url).status_code == 200
+            sql = next(
+                query['sql'] for query in context.captured_queries
+                if 'FROM "reviews_comment"' in query['sql']
+            )
+            assert f'"pub_date" {bound}' in sql, (
+                'Проверьте, что условие по курсору дополнено нестрогим '
+                'сравнением pub_date, по которому строится диапазон индекса'
+            )
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+            assert 'pub_date<' in plan or 'pub_date>' in plan, (
+                'Проверьте, что страница по курсору выбирается диапазоном '
+                f'индекса по pub_date: {plan}'
+            )
@@ -0,0 +1,133 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .common import create_titles
+
+
+class Test11SearchAPI:
+
+    def search(self, client, text):
+        response = client.get('/api/v1/titles/', {'search': text})
+        assert response.status_code == 200, (
+            'Проверьте, что GET запрос `/api/v1/titles/?search=` '
+            'возвращает статус 200'
+        )
+        return [title['name'] for title in response.json()['results']]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_titles_search(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        admin_client.post('/api/v1/titles/', data={
+            'name': 'Драматург',
+            'year': 1990,
+            'genre': titles[1]['genre'],
+            'category': titles[1]['category'],
+            'description': 'Пьеса о крутом повороте судьбы',
+        })
+        assert self.search(client, 'ПОВОРОТЫ') == ['Поворот туда', 'Драматург'], (
+            'Проверьте, что поиск не зависит от регистра и формы слова, '
+            'а совпадения в названии выше совпадений в описании'
+        )
+        assert self.search(client, 'главной драмы') == ['Проект']
+        assert self.search(client, 'пике крутое') == ['Поворот туда']
+        assert self.search(client, 'отсутствует') == []
+        admin_client.patch(
+            f'/api/v1/titles/{titles[1]["id"]}/', data={'name': 'Отсутствует'}
+        )
+        assert self.search(client, 'отсутствует') == ['Отсутствует'], (
+            'Проверьте, что поисковый индекс обновляется при изменении произведения'
+        )
+        admin_client.delete(f'/api/v1/titles/{titles[0]["id"]}/')
+        assert self.search(client, 'поворот') == ['Драматург']
+        response = client.get(
+            '/api/v1/titles/', {'search': 'поворот', 'ordering': 'name'}
+        )
+        assert response.json()['count'] == 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_reviews_and_comments_search(self, client, admin_client, admin):
+        from .common import create_comments
+        comments, reviews, titles, user, _ = create_comments(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        admin_client.patch(
+            f'{url}{reviews[0]["id"]}/', data={'text': 'Отличные актёры'}
+        )
+        response = client.get('/api/v1/reviews/search/', {'q': 'АКТЁРАМИ'})
+        assert response.status_code == 200, (
+            'Проверьте, что GET запрос `/api/v1/reviews/search/?q=` '
+            'возвращает статус 200'
+        )
+        results = response.json()['results']
+        assert [review['id'] for review in results] == [reviews[0]['id']]
+        assert results[0]['title'] == titles[0]['id']
+        response = client.get(
+            '/api/v1/reviews/search/', {'q': 'qwerty123', 'author': user.username}
+        )
+        assert [
+            review['id'] for review in response.json()['results']
+        ] == [reviews[1]['id']]
+        response = client.get(
+            '/api/v1/reviews/search/', {'q': 'qwerty123', 'title': titles[1]['id']}
+        )
+        assert response.json()['results'] == []
+        assert client.get('/api/v1/reviews/search/').status_code == 400
+
+        response = client.get('/api/v1/comments/search/', {'q': 'qwerty321'})
+        results = response.json()['results']
+        assert [comment['id'] for comment in results] == [comments[2]['id']]
+        assert results[0]['review'] == reviews[0]['id']
+        admin_client.delete(f'{url}{reviews[0]["id"]}/')
+        response = client.get('/api/v1/comments/search/', {'q': 'qwerty321'})
+        assert response.json()['results'] == [], (
+            'Проверьте, что удалённые комментарии исключаются из поиска'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_titles_facets(self, client, admin_client):
+        create_titles(admin_client)
+        response = client.get('/api/v1/titles/facets/')
+        assert response.status_code == 200, (
+            'Проверьте, что GET запрос `/api/v1/titles/facets/` '
+            'возвращает статус 200'
+        )
+        assert response.json() == {
+            'count': 2,
+            'genre': {'horror': 1, 'comedy': 1, 'drama': 1},
+            'category': {'films': 1, 'books': 1},
+            'year': {'2000': 1, '2020': 1},
+        }
+        response = client.get(
+            '/api/v1/titles/facets/', {'genre': 'horror', 'search': 'пике'}
+        )
+        assert response.json() == {
+            'count': 1,
+            'genre': {'horror': 1, 'comedy': 1},
+            'category': {'films': 1},
+            'year': {'2000': 1},
+        }, (
+            'Проверьте, что `/api/v1/titles/facets/` учитывает параметры фильтрации'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_search_ranked_in_one_pass(self, client, admin_client, admin):
+        from .common import create_comments
+        create_comments(admin_client, admin)
+        for url, params in (
+            ('/api/v1/titles/', {'search': 'поворот'}),
+            ('/api/v1/reviews/search/', {'q': 'qwerty123'}),
+            ('/api/v1/comments/search/', {'q': 'qwerty321'}),
+        ):
+            with CaptureQueriesContext(connection) as context:
+                response = client.get(url, params)
+            assert response.json()['results'], (
+                f'Проверьте, что GET запрос `{url}` находит записи'
+            )
+            for query in context.captured_queries:
+                with connection.cursor() as cursor:
+                    cursor.execute(f'EXPLAIN QUERY PLAN {query["sql"]}')
+                    plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+                assert 'CORRELATED' not in plan, (
+                    'Проверьте, что ранг поиска читается из индекса '
+                    f'в том же проходе, без подзапроса на каждую строку: {plan}'
+                )
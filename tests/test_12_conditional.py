@@ -0,0 +1,174 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .common import create_categories, create_genre, create_reviews
+
+
+class Test12ConditionalGetAPI:
+
+    def check_not_modified(self, client, url):
+        response = client.get(url)
+        etag = response['ETag']
+        assert etag, f'Проверьте, что GET запрос `{url}` возвращает ETag'
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304, (
+            f'Проверьте, что GET запрос `{url}` с актуальным If-None-Match '
+            'возвращает статус 304'
+        )
+        assert not context.captured_queries, (
+            'Проверьте, что ответ 304 не обращается к базе данных'
+        )
+        # у ресурсов, которые ещё не менялись, даты изменения нет
+        if response.has_header('Last-Modified'):
+            response = client.get(
+                url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+            )
+            assert response.status_code == 304
+        return etag
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_conditional_get(self, client, admin_client, admin):
+        reviews, titles, _, _ = create_reviews(admin_client, admin)
+        title_url = f'/api/v1/titles/{titles[0]["id"]}/'
+        reviews_url = f'{title_url}reviews/'
+        comments_url = f'{reviews_url}{reviews[0]["id"]}/comments/'
+        urls = (
+            '/api/v1/titles/', title_url, reviews_url, comments_url,
+            '/api/v1/categories/', '/api/v1/genres/',
+        )
+        etags = {url: self.check_not_modified(client, url) for url in urls}
+        admin_client.patch(
+            f'{reviews_url}{reviews[0]["id"]}/', data={'score': 10}
+        )
+        changed = {
+            url for url in urls
+            if client.get(url, HTTP_IF_NONE_MATCH=etags[url]).status_code == 200
+        }
+        assert changed == {'/api/v1/titles/', title_url, reviews_url}, (
+            'Проверьте, что изменение отзыва меняет ETag произведения, '
+            'списка произведений и списка отзывов, но не других ресурсов'
+        )
+        admin_client.post(comments_url, data={'text': 'Новый'})
+        response = client.get(comments_url, HTTP_IF_NONE_MATCH=etags[comments_url])
+        assert response.status_code == 200
+        assert response.json()['count'] == 1
+        response = client.get(
+            '/api/v1/titles/?page=2', HTTP_IF_NONE_MATCH=etags['/api/v1/titles/']
+        )
+        assert response.status_code != 304, (
+            'Проверьте, что ETag зависит от параметров запроса'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_cached_catalog_lists(self, client, admin_client):
+        create_categories(admin_client)
+        create_genre(admin_client)
+        for url in ('/api/v1/categories/', '/api/v1/genres/?search=Драма'):
+            expected = client.get(url).json()
+            with CaptureQueriesContext(connection) as context:
+                response = client.get(url)
+            assert response.json() == expected
+            assert not context.captured_queries, (
+                f'Проверьте, что повторный GET запрос `{url}` '
+                'отдаётся из кэша без запросов к базе данных'
+            )
+        admin_client.post(
+            '/api/v1/categories/', data={'name': 'Музыка', 'slug': 'music'}
+        )
+        assert client.get('/api/v1/categories/').json()['count'] == 3, (
+            'Проверьте, что создание категории сбрасывает кэш списка'
+        )
+        admin_client.delete('/api/v1/genres/drama/')
+        assert client.get('/api/v1/genres/?search=Драма').json()['count'] == 0
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_versions_changed_by_other_process(self, client, admin_client):
+        from django.db import transaction
+        from reviews import versions
+        from reviews.models import Category
+        create_categories(admin_client)
+        assert client.get('/api/v1/categories/').json()['count'] == 2
+        cache_key = versions.cache_key(versions.CATEGORIES)
+        stale = versions.get_cache().get(cache_key)
+        with transaction.atomic():
+            Category.objects.bulk_create(
+                [Category(name='Музыка', slug='music')]
+            )
+            versions.bump(versions.CATEGORIES)
+            # параллельный запрос прочитал версию до фиксации
+            versions.get_cache().set(cache_key, stale)
+        assert client.get('/api/v1/categories/').json()['count'] == 3, (
+            'Проверьте, что версии в общем кэше сбрасываются и после '
+            'фиксации транзакции, в которой они изменились'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_cached_title_representations(self, client, admin_client, admin):
+        from reviews.models import Category
+        reviews, titles, _, _ = create_reviews(admin_client, admin)
+        expected = client.get('/api/v1/titles/').json()
+        with CaptureQueriesContext(connection) as context:
+            response = client.get('/api/v1/titles/')
+        assert response.json() == expected
+        sql = [query['sql'] for query in context.captured_queries]
+        assert not any('"reviews_category"' in query for query in sql), (
+            'Проверьте, что повторный GET запрос `/api/v1/titles/` '
+            'выбирает только версии, количество и id произведений, '
+            'а представления берёт из кэша'
+        )
+        assert len(sql) == 2
+        title_url = f'/api/v1/titles/{titles[0]["id"]}/'
+        admin_client.patch(
+            f'{title_url}reviews/{reviews[0]["id"]}/', data={'score': 8}
+        )
+        assert client.get(title_url).json()['rating'] == 5, (
+            'Проверьте, что изменение отзыва обновляет кэш произведения'
+        )
+        category = Category.objects.get(slug=titles[0]['category'])
+        category.name = 'Кино'
+        category.save()
+        results = {
+            title['id']: title
+            for title in client.get('/api/v1/titles/').json()['results']
+        }
+        assert results[titles[0]['id']]['category']['name'] == 'Кино', (
+            'Проверьте, что изменение категории обновляет кэш произведений'
+        )
+        assert client.get('/api/v1/titles/999/').status_code == 404
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_users_version_follows_username(self, client, admin_client,
+                                               admin):
+        from django.contrib.auth.tokens import default_token_generator
+        from reviews.models import User
+        from .common import auth_client
+        reviews, titles, user, _ = create_reviews(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        etag = client.get(url)['ETag']
+        response = client.post('/api/v1/auth/signup/', data={
+            'username': 'newbie', 'email': 'newbie@yamdb.fake'
+        })
+        assert response.status_code == 200
+        newbie = User.objects.get(username='newbie')
+        response = client.post('/api/v1/auth/token/', data={
+            'username': 'newbie',
+            'confirmation_code': default_token_generator.make_token(newbie),
+        })
+        assert response.status_code == 200
+        auth_client(user).patch('/api/v1/users/me/', data={'bio': 'Новое'})
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304, (
+            'Проверьте, что регистрация и изменение полей пользователя, '
+            'кроме имени, не меняют ETag отзывов'
+        )
+        admin_client.patch(
+            f'/api/v1/users/{user.username}/', data={'username': 'renamed'}
+        )
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что смена имени пользователя меняет ETag отзывов'
+        )
+        assert 'renamed' in {
+            review['author'] for review in response.json()['results']
+        }
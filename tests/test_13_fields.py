@@ -0,0 +1,84 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .common import create_comments
+
+
+class Test13SparseFieldsAPI:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_fields_and_omit(self, client, admin_client, admin):
+        _, reviews, titles, _, _ = create_comments(admin_client, admin)
+        title_url = f'/api/v1/titles/{titles[0]["id"]}/'
+        reviews_url = f'{title_url}reviews/'
+        comments_url = f'{reviews_url}{reviews[0]["id"]}/comments/'
+        cases = (
+            ('/api/v1/titles/?fields=id,name,rating', {'id', 'name', 'rating'}),
+            ('/api/v1/titles/?omit=description,genre,category', {'id', 'name', 'year', 'rating'}),
+            ('/api/v1/titles/?histogram=1&fields=id,histogram', {'id', 'histogram'}),
+            ('/api/v1/titles/top/?fields=id,weighted_rating', {'id', 'weighted_rating'}),
+            (f'{reviews_url}?fields=id,author', {'id', 'author'}),
+            (f'{comments_url}?omit=text', {'id', 'author', 'pub_date'}),
+            ('/api/v1/categories/?fields=slug', {'slug'}),
+            ('/api/v1/genres/?omit=slug', {'name'}),
+            ('/api/v1/reviews/search/?q=qwerty&fields=id,title', {'id', 'title'}),
+        )
+        for url, expected in cases:
+            data = client.get(url).json()
+            results = data if isinstance(data, list) else data['results']
+            assert results, f'Проверьте, что GET запрос `{url}` возвращает данные'
+            assert set(results[0]) == expected, (
+                f'Проверьте, что GET запрос `{url}` возвращает только поля '
+                f'{sorted(expected)}'
+            )
+        data = client.get(f'{title_url}?fields=id,name').json()
+        assert set(data) == {'id', 'name'}
+        response = admin_client.get('/api/v1/users/?fields=username')
+        assert set(response.json()['results'][0]) == {'username'}
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_queryset_pruned(self, client, admin_client, admin):
+        _, reviews, titles, _, _ = create_comments(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        for path, table in (
+            (f'{url}?fields=id,author', 'reviews_review'),
+            (f'{url}{reviews[0]["id"]}/comments/?fields=id,author',
+             'reviews_comment'),
+        ):
+            with CaptureQueriesContext(connection) as context:
+                response = client.get(path)
+            assert response.status_code == 200
+            assert len(response.json()['results']) > 1
+            assert len([
+                query for query in context.captured_queries
+                if f'FROM "{table}"' in query['sql']
+            ]) == 2, (
+                'Проверьте, что при выборе полей список загружается '
+                'одним запросом с подсчётом, без запроса на каждую строку'
+            )
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(f'{url}?fields=id,author')
+        sql = ' '.join(query['sql'] for query in context.captured_queries)
+        assert '"reviews_review"."text"' not in sql, (
+            'Проверьте, что столбцы пропущенных полей не загружаются из БД'
+        )
+        assert '"users_user"."email"' not in sql
+        with CaptureQueriesContext(connection) as context:
+            client.get('/api/v1/titles/?histogram=1&fields=id,name')
+        sql = ' '.join(query['sql'] for query in context.captured_queries)
+        assert 'reviews_genre' not in sql and 'reviews_category' not in sql, (
+            'Проверьте, что связи пропущенных полей не присоединяются '
+            'и не подгружаются'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_write_ignores_fields(self, admin_client):
+        response = admin_client.post(
+            '/api/v1/categories/?fields=slug',
+            data={'name': 'Книга', 'slug': 'books'}
+        )
+        assert response.status_code == 201
+        assert response.json() == {'name': 'Книга', 'slug': 'books'}, (
+            'Проверьте, что параметр fields не влияет на запросы записи'
+        )
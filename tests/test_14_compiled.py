@@ -0,0 +1,67 @@
+import pytest
+from django.core.management import call_command
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.serializers import (
+    COMPILED_CONTEXT,
+    CategorySerializer,
+    CommentSearchSerializer,
+    CommentSerializer,
+    GenreSerializer,
+    ReviewSearchSerializer,
+    ReviewSerializer,
+    TitleSerializer,
+    TopTitleSerializer,
+)
+from reviews.models import Category, Comment, Genre, Review, Title
+
+from .common import create_comments
+
+
+def render(serializer_class, objects, compiled, request=None):
+    serializer = serializer_class(objects, many=True, context={
+        COMPILED_CONTEXT: compiled, 'request': request
+    })
+    return JSONRenderer().render(serializer.data)
+
+
+class Test14CompiledSerializersAPI:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_byte_identical_json(self, admin_client, admin):
+        create_comments(admin_client, admin)
+        admin_client.post('/api/v1/titles/', data={
+            'name': 'Без отзывов', 'year': 1999, 'genre': ['drama'], 'category': 'films'
+        })
+        titles = list(Title.objects.select_related(
+            'category', 'rank', 'histogram'
+        ).prefetch_related('genre'))
+        request = Request(APIRequestFactory().get('/', {'histogram': '1'}))
+        cases = (
+            (TitleSerializer, titles, None),
+            (TitleSerializer, titles, request),
+            (TopTitleSerializer, titles, None),
+            (ReviewSerializer, Review.objects.select_related('author'), None),
+            (ReviewSearchSerializer, Review.objects.all(), None),
+            (CommentSerializer, Comment.objects.all(), None),
+            (CommentSearchSerializer, Comment.objects.all(), None),
+            (GenreSerializer, Genre.objects.all(), None),
+            (CategorySerializer, Category.objects.all(), None),
+        )
+        for serializer_class, objects, request in cases:
+            assert render(serializer_class, objects, True, request) == render(
+                serializer_class, objects, False, request
+            ), (
+                f'Проверьте, что быстрая сериализация {serializer_class.__name__} '
+                'возвращает тот же JSON, что и DRF'
+            )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_benchmark_command(self, admin_client, admin, capsys):
+        create_comments(admin_client, admin)
+        call_command('benchmark_serializers', '--repeat', '1')
+        output = capsys.readouterr().out
+        for name in ('titles', 'reviews', 'comments', 'genres', 'categories'):
+            assert f'{name}: ' in output
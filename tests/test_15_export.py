@@ -0,0 +1,122 @@
+import json
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from api_yamdb import settings
+
+from .common import auth_client, create_comments
+
+
+def read_ndjson(response):
+    assert response.streaming, 'Проверьте, что выгрузка отдаётся потоком'
+    assert response['Content-Type'] == 'application/x-ndjson'
+    content = b''.join(response.streaming_content).decode()
+    return [json.loads(line) for line in content.splitlines()]
+
+
+class Test15ExportAPI:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_export(self, client, admin_client, admin, monkeypatch):
+        monkeypatch.setattr(settings, 'EXPORT_CHUNK_SIZE', 1)
+        comments, reviews, titles, user, _ = create_comments(admin_client, admin)
+        for resource in ('titles', 'reviews', 'comments'):
+            url = f'/api/v1/export/{resource}.ndjson'
+            assert client.get(url).status_code == 401
+            assert auth_client(user).get(url).status_code == 403, (
+                f'Проверьте, что выгрузка `{url}` доступна только администратору'
+            )
+        rows = read_ndjson(admin_client.get('/api/v1/export/titles.ndjson'))
+        assert [row['id'] for row in rows] == sorted(
+            title['id'] for title in titles
+        )
+        assert rows[0] == admin_client.get(
+            f'/api/v1/titles/{rows[0]["id"]}/'
+        ).json(), 'Проверьте, что выгрузка произведений совпадает с API'
+        rows = read_ndjson(admin_client.get('/api/v1/export/reviews.ndjson'))
+        assert {row['id'] for row in rows} == {review['id'] for review in reviews}
+        assert {'id', 'text', 'author', 'score', 'pub_date', 'title'} == set(rows[0])
+        rows = read_ndjson(admin_client.get(
+            '/api/v1/export/comments.ndjson',
+            {'author': user.username}
+        ))
+        assert [row['text'] for row in rows] == ['qwerty123']
+        assert rows[0]['review'] == reviews[0]['id']
+        assert rows[0]['title'] == titles[0]['id']
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_export_since(self, admin_client, admin):
+        comments, reviews, titles, _, _ = create_comments(admin_client, admin)
+        since = timezone.now().isoformat()
+        admin_client.patch(
+            f'/api/v1/titles/{titles[1]["id"]}/', data={'year': 2019}
+        )
+        admin_client.post(
+            f'/api/v1/titles/{titles[1]["id"]}/reviews/',
+            data={'text': 'Новый', 'score': 7}
+        )
+        rows = read_ndjson(admin_client.get(
+            '/api/v1/export/titles.ndjson', {'since': since}
+        ))
+        assert [row['id'] for row in rows] == [titles[1]['id']], (
+            'Проверьте, что параметр since отбирает изменённые произведения'
+        )
+        rows = read_ndjson(admin_client.get(
+            '/api/v1/export/reviews.ndjson', {'since': since}
+        ))
+        assert [row['text'] for row in rows] == ['Новый']
+        response = admin_client.get(
+            '/api/v1/export/reviews.ndjson', {'since': 'вчера'}
+        )
+        assert response.status_code == 400
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_export_without_versions_and_histogram(self, admin_client,
+                                                      admin):
+        from reviews.models import Title
+        create_comments(admin_client, admin)
+        since = timezone.now().isoformat()
+        Title.objects.bulk_create([Title(id=100, name='Без версии', year=2000)])
+        rows = read_ndjson(admin_client.get(
+            '/api/v1/export/titles.ndjson', {'since': since}
+        ))
+        assert [row['id'] for row in rows] == [100], (
+            'Проверьте, что параметр since не пропускает произведения, '
+            'загруженные без счётчика изменений'
+        )
+        counts = []
+        for params in ({}, {'histogram': 1}):
+            with CaptureQueriesContext(connection) as context:
+                rows = read_ndjson(admin_client.get(
+                    '/api/v1/export/titles.ndjson', params
+                ))
+            counts.append(len(context.captured_queries))
+        assert 'histogram' in rows[0]
+        assert counts[0] == counts[1], (
+            'Проверьте, что распределения оценок выгружаются '
+            'без отдельного запроса на каждое произведение'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_export_ignores_ordering(self, admin_client, admin,
+                                        monkeypatch):
+        monkeypatch.setattr(settings, 'EXPORT_CHUNK_SIZE', 1)
+        _, _, titles, _, _ = create_comments(admin_client, admin)
+        admin_client.patch(
+            f'/api/v1/titles/{titles[1]["id"]}/',
+            data={'name': 'Поворот, поворот'}
+        )
+        expected = sorted(title['id'] for title in titles)
+        for params in (
+            {'ordering': '-name'}, {'ordering': 'year'}, {'search': 'поворот'}
+        ):
+            rows = read_ndjson(admin_client.get(
+                '/api/v1/export/titles.ndjson', params
+            ))
+            assert [row['id'] for row in rows] == expected, (
+                'Проверьте, что выгрузка идёт в порядке id без повторов '
+                f'и пропусков при параметрах {params}'
+            )
@@ -0,0 +1,213 @@
+import gzip
+from csv import DictReader
+
+import pytest
+from django.core.management import call_command
+
+from reviews import csv_data
+from reviews.models import (
+    Comment, Genre_Title, ImportCheckpoint, Review, RowFingerprint, Title,
+    User
+)
+
+CSV_FILES = {
+    'category.csv': (
+        'id,name,slug\n'
+        '1,Фильм,movie\n'
+        '2,Книга,book\n'
+        '3,Повтор,movie\n'
+    ),
+    'genre.csv': 'id,name,slug\n1,Драма,drama\n2,Комедия,comedy\n',
+    'titles.csv': (
+        'id,name,year,category\n'
+        '1,Побег из Шоушенка,1994,1\n'
+        '2,Мастер и Маргарита,1967,2\n'
+        '3,Без категории,2000,9\n'
+    ),
+    'genre_title.csv': (
+        'id,title_id,genre_id\n'
+        '1,1,1\n'
+        '2,2,1\n'
+        '3,2,2\n'
+        '4,2,2\n'
+        '5,3,1\n'
+    ),
+    'users.csv': (
+        'id,username,email,role,bio,first_name,last_name\n'
+        '100,bingobongo,bingobongo@yamdb.fake,user,,,\n'
+        '101,capt_obvious,capt_obvious@yamdb.fake,admin,,,\n'
+    ),
+    'review.csv': (
+        'id,title_id,text,author,score,pub_date\n'
+        '1,1,"Ставлю десять звёзд!\nВторая строка",100,10,2019-09-24T21:08:21.567Z\n'
+        '2,1,Неплохо,101,6,2019-09-25T21:08:21.567Z\n'
+        '3,1,Повторный отзыв,101,5,2019-09-26T21:08:21.567Z\n'
+        '4,2,Оценка вне шкалы,100,11,2019-09-26T21:08:21.567Z\n'
+        '5,2,Плохая дата,100,5,вчера\n'
+        '6,2,Отлично,100,9,2019-09-27T21:08:21.567Z\n'
+    ),
+    'comments.csv': (
+        'id,review_id,text,author,pub_date\n'
+        '1,1,Согласен,101,2020-01-13T23:20:02.422Z\n'
+        '2,3,К пропущенному отзыву,101,2020-01-13T23:20:02.422Z\n'
+    ),
+}
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    for name, content in CSV_FILES.items():
+        (tmp_path / name).write_text(content, encoding='utf-8')
+    return tmp_path
+
+
+class Test16ImportCSV:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_bulk_import_skips_bad_rows(self, csv_path, capsys):
+        call_command('data_from_csv', '--path', str(csv_path), '--batch-size', '2')
+        output = capsys.readouterr().out
+        for line in (
+            'Category: 2 rows, 1 rejected',
+            'Title: 2 rows, 1 rejected',
+            'Genre_Title: 3 rows, 2 rejected',
+            'User: 2 rows, 0 rejected',
+            'Review: 3 rows, 3 rejected',
+            'Comment: 1 rows, 1 rejected',
+        ):
+            assert line in output, (
+                'Проверьте, что команда data_from_csv сообщает число '
+                f'загруженных и пропущенных строк: `{line}`'
+            )
+        assert 'rows/s' in output
+        assert Title.objects.count() == 2
+        assert Genre_Title.objects.count() == 3
+        assert User.objects.count() == 2
+        assert Comment.objects.count() == 1
+        assert Review.objects.get(pk=1).text == 'Ставлю десять звёзд!\nВторая строка'
+        title = Title.objects.get(pk=1)
+        assert (title.score_sum, title.score_count, title.rating) == (16, 2, 8), (
+            'Проверьте, что после загрузки пересчитываются оценки произведений'
+        )
+        assert title.histogram.score_10 == 1
+        assert Title.objects.filter(rank__isnull=False).count() == 2
+        assert list(
+            Review.objects.order_by('pk').values_list('pk', flat=True)
+        ) == [1, 2, 6]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_repeated_import_rejects_existing(self, csv_path, capsys):
+        call_command('data_from_csv', '--path', str(csv_path))
+        capsys.readouterr()
+        call_command('data_from_csv', '--path', str(csv_path))
+        output = capsys.readouterr().out
+        assert 'Review: 0 rows, 6 rejected' in output
+        assert Review.objects.count() == 3
+
+    def test_03_chunks_split_on_record_boundaries(self, csv_path):
+        source = str(csv_path / 'review.csv')
+        with open(source, encoding='utf-8', newline='') as f:
+            expected = list(DictReader(f))
+        for chunk_bytes in (1, 16, 64, 10 ** 6):
+            chunks = list(csv_data.read_rows(source, chunk_bytes=chunk_bytes))
+            rows = [row for rows, _ in chunks for row in rows]
+            assert rows == expected, (
+                'Проверьте, что куски файла не разрывают записи '
+                'с переводами строк внутри текста'
+            )
+            assert chunks[-1][1] == (csv_path / 'review.csv').stat().st_size
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_resume_after_failure(self, csv_path, monkeypatch, capsys):
+        monkeypatch.setattr(csv_data, 'CHUNK_BYTES', 64)
+        save = ImportCheckpoint.save
+        calls = []
+
+        def failing_save(checkpoint, *args, **kwargs):
+            if checkpoint.source.endswith('review.csv'):
+                calls.append(checkpoint.offset)
+                if len(calls) == 3:
+                    raise RuntimeError('import interrupted')
+            return save(checkpoint, *args, **kwargs)
+
+        monkeypatch.setattr(ImportCheckpoint, 'save', failing_save)
+        with pytest.raises(RuntimeError):
+            call_command('data_from_csv', '--path', str(csv_path), '--resume')
+        checkpoint = ImportCheckpoint.objects.get(source__endswith='review.csv')
+        assert checkpoint.offset == calls[1]
+        assert Review.objects.count() == checkpoint.inserted > 0
+        assert checkpoint.last_id == Review.objects.order_by('-pk')[0].pk
+        monkeypatch.setattr(ImportCheckpoint, 'save', save)
+        capsys.readouterr()
+        call_command('data_from_csv', '--path', str(csv_path), '--resume')
+        output = capsys.readouterr().out
+        assert 'Category: 0 rows, 0 rejected' in output, (
+            'Проверьте, что при --resume загруженные файлы не читаются заново'
+        )
+        assert list(
+            Review.objects.order_by('pk').values_list('pk', flat=True)
+        ) == [1, 2, 6]
+        assert Title.objects.get(pk=1).rating == 8
+        assert not ImportCheckpoint.objects.exists()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_gzip_and_workers(self, csv_path, tmp_path_factory, monkeypatch):
+        monkeypatch.setattr(csv_data, 'CHUNK_BYTES', 32)
+        gzip_path = tmp_path_factory.mktemp('gzip')
+        for name, content in CSV_FILES.items():
+            with gzip.open(gzip_path / f'{name}.gz', 'wt', encoding='utf-8') as f:
+                f.write(content)
+        call_command(
+            'data_from_csv', '--path', str(gzip_path), '--workers', '2'
+        )
+        assert list(
+            Review.objects.order_by('pk').values_list('pk', flat=True)
+        ) == [1, 2, 6]
+        assert Review.objects.get(pk=1).text == 'Ставлю десять звёзд!\nВторая строка'
+        assert Genre_Title.objects.count() == 3
+
+    @pytest.mark.django_db(transaction=True)
+    def test_06_upsert_changed_rows(self, csv_path, client, capsys):
+        call_command('data_from_csv', '--path', str(csv_path), '--upsert')
+        assert RowFingerprint.objects.filter(table='reviews_review').count() == 3
+        title_url = '/api/v1/titles/1/'
+        assert client.get(title_url).json()['rating'] == 8
+        capsys.readouterr()
+        call_command('data_from_csv', '--path', str(csv_path), '--upsert')
+        output = capsys.readouterr().out
+        assert 'Review: 0 rows, 3 rejected, 3 unchanged' in output, (
+            'Проверьте, что --upsert пропускает строки с неизменным хэшем'
+        )
+        reviews = CSV_FILES['review.csv'].replace(
+            '2,1,Неплохо,101,6,', '2,1,Так себе,101,2,'
+        ).replace(
+            '6,2,Отлично,100,9,2019-09-27T21:08:21.567Z\n',
+            '7,2,Шедевр,101,10,2019-09-28T21:08:21.567Z\n'
+        )
+        (csv_path / 'review.csv').write_text(reviews, encoding='utf-8')
+        titles = CSV_FILES['titles.csv'].replace(
+            'Мастер и Маргарита', 'Мастер и Маргарита (роман)'
+        )
+        (csv_path / 'titles.csv').write_text(titles, encoding='utf-8')
+        call_command('data_from_csv', '--path', str(csv_path), '--upsert')
+        output = capsys.readouterr().out
+        assert 'Title: 1 rows, 1 rejected, 1 unchanged' in output
+        assert 'Review: 2 rows, 3 rejected, 1 unchanged' in output
+        assert 'Review: 1 deleted' in output
+        assert list(
+            Review.objects.order_by('pk').values_list('pk', flat=True)
+        ) == [1, 2, 7]
+        assert Review.objects.get(pk=2).text == 'Так себе'
+        assert client.get(title_url).json()['rating'] == 6, (
+            'Проверьте, что --upsert пересчитывает рейтинг изменённых '
+            'произведений и сбрасывает их кэш'
+        )
+        title = Title.objects.get(pk=2)
+        assert title.name == 'Мастер и Маргарита (роман)'
+        assert (title.score_count, title.rating) == (1, 10)
+        assert title.histogram.score_10 == 1 and title.histogram.score_9 == 0
+        assert set(RowFingerprint.objects.filter(
+            table='reviews_review'
+        ).values_list('row_id', flat=True)) == {1, 2, 7}
+        results = client.get('/api/v1/reviews/search/', {'q': 'шедевр'}).json()
+        assert [review['id'] for review in results['results']] == [7]
@@ -0,0 +1,54 @@
+import gzip
+
+import pytest
+from django.core.management import call_command
+
+from reviews.models import (
+    Category, Comment, Genre, Genre_Title, Review, Title, User
+)
+
+from .common import create_comments
+
+MODELS = (Comment, Review, Genre_Title, Title, Genre, Category, User)
+
+
+def snapshot():
+    return {
+        model.__name__: list(model.objects.order_by('pk').values())
+        for model in MODELS
+    }
+
+
+class Test17DumpCSV:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_round_trip(self, admin_client, admin, tmp_path, capsys):
+        comments, _, _, _, _ = create_comments(admin_client, admin)
+        comment = Comment.objects.get(pk=comments[0]['id'])
+        comment.text = 'Текст, с "кавычками"\nи переводом строки'
+        comment.save()
+        Title.objects.create(name='Без категории', year=2000)
+        before = snapshot()
+        plain = tmp_path / 'plain'
+        call_command('dump_to_csv', '--path', str(plain), '--batch-size', '2')
+        assert 'Comment: 3 rows' in capsys.readouterr().out, (
+            'Проверьте, что команда dump_to_csv сообщает число '
+            'выгруженных строк'
+        )
+        for model in MODELS:
+            model.objects.all().delete()
+        call_command('data_from_csv', '--path', str(plain))
+        assert snapshot() == before, (
+            'Проверьте, что загрузка выгрузки dump_to_csv через data_from_csv '
+            'восстанавливает данные без изменений'
+        )
+        packed = tmp_path / 'packed'
+        call_command(
+            'dump_to_csv', '--path', str(packed), '--gzip', '--workers', '3'
+        )
+        for source in plain.iterdir():
+            target = packed / f'{source.name}.gz'
+            assert gzip.decompress(target.read_bytes()) == source.read_bytes(), (
+                'Проверьте, что повторная выгрузка совпадает с первой, '
+                'в том числе в режимах --gzip и --workers'
+            )
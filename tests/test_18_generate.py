@@ -0,0 +1,61 @@
+import pytest
+from django.core.management import call_command
+from django.db.models import Count
+
+from reviews.models import (
+    Category, Comment, Genre, Genre_Title, Review, Title, User
+)
+
+MODELS = (Comment, Review, Genre_Title, Title, Genre, Category, User)
+OPTIONS = (
+    '--users', '30', '--categories', '3', '--genres', '5', '--titles', '20',
+    '--genres-per-title', '2', '--reviews-per-title', '5',
+    '--comments-per-review', '1', '--batch-size', '7',
+)
+
+
+def generate(seed):
+    call_command('generate_dataset', '--seed', str(seed), *OPTIONS)
+    return {
+        model.__name__: list(model.objects.order_by('pk').values())
+        for model in MODELS
+    }
+
+
+class Test18GenerateDataset:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_generated_counts(self, client, capsys):
+        generate(1)
+        output = capsys.readouterr().out
+        for line in ('User: 30 rows', 'Title: 20 rows', 'Genre_Title: 40 rows'):
+            assert line in output, (
+                'Проверьте, что команда generate_dataset создаёт заданное '
+                f'число строк: `{line}`'
+            )
+        counts = list(Title.objects.annotate(
+            reviews_count=Count('reviews')
+        ).order_by('-reviews_count').values_list('reviews_count', flat=True))
+        assert 90 <= sum(counts) <= 110
+        assert counts[0] > 3 * counts[len(counts) // 2], (
+            'Проверьте, что отзывы распределены по произведениям неравномерно'
+        )
+        assert all(
+            title.score_count == title.reviews.count()
+            for title in Title.objects.all()
+        ), 'Проверьте, что после генерации пересчитываются оценки'
+        title = Title.objects.order_by('-score_count').first()
+        response = client.get(f'/api/v1/titles/{title.id}/')
+        assert response.json()['rating'] == title.rating
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_same_seed_same_data(self):
+        first = generate(7)
+        for model in MODELS:
+            model.objects.all().delete()
+        assert generate(7) == first, (
+            'Проверьте, что одно зерно генерирует одни и те же данные'
+        )
+        for model in MODELS:
+            model.objects.all().delete()
+        assert generate(8) != first
@@ -0,0 +1,43 @@
+import json
+
+import pytest
+from django.core.management import call_command
+
+from reviews.models import Review, Title, User
+
+ROUTES = (
+    'titles-list', 'titles-filter', 'titles-detail', 'titles-top',
+    'reviews-list', 'reviews-detail', 'comments-list', 'comments-detail',
+    'categories-list', 'genres-list', 'users-list', 'users-me',
+    'auth-signup', 'auth-token', 'reviews-create', 'comments-create',
+)
+
+
+class Test19BenchmarkAPI:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_report(self, tmp_path, capsys):
+        output = tmp_path / 'benchmark.json'
+        call_command(
+            'benchmark_api', '--requests', '3', '--warmup', '1',
+            '--users', '5', '--titles', '3', '--reviews-per-title', '2',
+            '--comments-per-review', '1', '--output', str(output)
+        )
+        assert 'titles-list: p50' in capsys.readouterr().out
+        report = json.loads(output.read_text(encoding='utf-8'))
+        assert report['dataset']['titles'] == 3
+        for name in ROUTES:
+            assert name in report['routes'], (
+                f'Проверьте, что маршрут `{name}` входит в замер'
+            )
+        for name, result in report['routes'].items():
+            assert result['p50_ms'] <= result['p95_ms'] <= result['p99_ms']
+            assert result['queries'] >= 0 and result['allocated_bytes'] > 0
+            assert all(code.startswith('2') for code in result['statuses']), (
+                f'Проверьте, что запросы к маршруту `{name}` успешны: '
+                f'{result["statuses"]}'
+            )
+        assert not (
+            Title.objects.exists() or Review.objects.exists()
+            or User.objects.exists()
+        ), 'Проверьте, что замер не оставляет данных в БД'